@@ -11,3 +11,8 @@ COLLECTION_NAME = os.getenv("COLLECTION_NAME", "policy_documents")
 
 LLM_MODEL = os.getenv("LLM_MODEL", "llama3.2:3b")
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Embedding backend: "torch", "onnx" or "onnx-int8" (ONNX Runtime; needs `pip install sentence-transformers[onnx]`)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")  # Quantized export shipped in the model repo
+EMBEDDING_PARITY_MIN_COSINE = 0.99  # Lowest allowed cosine between ONNX and PyTorch vectors of the same text
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add parent dir to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_huggingface import HuggingFaceEmbeddings
+import src.config as config
+
+PARITY_TEXTS = [
+    "What is the maternity leave duration?",
+    "How many days was EMP1001 absent in November?",
+    "Employees are entitled to 24 days of paid annual leave, accrued monthly from the date of joining.",
+    "Work from home requests must be approved by the reporting manager at least two days in advance.",
+    "Sick leave of more than three consecutive days requires a medical certificate.",
+]
+
+
+def _require_onnx_support():
+    """
+    The `backend` model kwarg needs sentence-transformers 3.2+ with its [onnx] extra; older
+    versions would fail deep inside model loading with an unrelated-looking error.
+    """
+    import sentence_transformers
+    major, minor = (int(part) for part in sentence_transformers.__version__.split(".")[:2])
+    if (major, minor) < (3, 2):
+        raise RuntimeError(f"EMBEDDING_BACKEND=onnx needs sentence-transformers>=3.2 (installed: "
+                           f"{sentence_transformers.__version__}); pip install 'sentence-transformers[onnx]>=3.2'")
+    try:
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("EMBEDDING_BACKEND=onnx needs the ONNX extra: "
+                           "pip install 'sentence-transformers[onnx]>=3.2'") from e
+
+
+def get_embeddings(backend=None):
+    """
+    Embedding function shared by ingestion and retrieval, so the vector store is always
+    written and queried with the same backend.
+    """
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend == "torch":
+        model_kwargs = {}
+    elif backend == "onnx":
+        model_kwargs = {"backend": "onnx"}
+    elif backend == "onnx-int8":
+        model_kwargs = {"backend": "onnx", "model_kwargs": {"file_name": config.EMBEDDING_ONNX_INT8_FILE}}
+    else:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected 'torch', 'onnx' or 'onnx-int8'")
+    if backend != "torch":
+        _require_onnx_support()
+    return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME, model_kwargs=model_kwargs)
+
+
+def parity_check(backend=None, texts=None, min_cosine=config.EMBEDDING_PARITY_MIN_COSINE):
+    """
+    Compares the configured ONNX backend against PyTorch on the same texts and reports
+    the lowest cosine similarity and single-query latency of both.
+    """
+    backend = backend or config.EMBEDDING_BACKEND
+    texts = list(texts or PARITY_TEXTS)
+    results = {}
+    for name in ("torch", backend):
+        start = time.perf_counter()
+        embeddings = get_embeddings(name)
+        load_s = time.perf_counter() - start
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        start = time.perf_counter()
+        for text in texts:
+            embeddings.embed_query(text)
+        results[name] = (vectors, load_s, (time.perf_counter() - start) / len(texts))
+
+    reference, candidate = results["torch"][0], results[backend][0]
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    cosines = (reference * candidate).sum(axis=1) / np.clip(norms, 1e-12, None)
+    report = {
+        "backend": backend,
+        "min_cosine": round(float(cosines.min()), 6),
+        "max_abs_diff": round(float(np.abs(reference - candidate).max()), 6),
+        "passed": bool(cosines.min() >= min_cosine),
+        "torch_load_s": round(results["torch"][1], 3),
+        "backend_load_s": round(results[backend][1], 3),
+        "torch_query_ms": round(results["torch"][2] * 1000, 3),
+        "backend_query_ms": round(results[backend][2] * 1000, 3),
+    }
+    print(f"Parity {backend}: min cosine {report['min_cosine']} (threshold {min_cosine}), "
+          f"query {report['torch_query_ms']} ms -> {report['backend_query_ms']} ms")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that an ONNX embedding backend matches PyTorch.")
+    parser.add_argument("--backend", choices=["onnx", "onnx-int8"], default="onnx-int8")
+    args = parser.parse_args()
+    report = parity_check(args.backend)
+    print(report)
+    sys.exit(0 if report["passed"] else 1)
@@ -8,9 +8,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 import src.config as config
+from src.embeddings import get_embeddings
 
 def ingest_file(file_path: str, file_type: str):
     """
@@ -45,7 +45,7 @@ def ingest_file(file_path: str, file_type: str):
 
     # 3. Create Embeddings
     print("Initializing embeddings model...")
-    embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME)
+    embeddings = get_embeddings()
 
     # 4. Store in ChromaDB
     print(f"Persisting to ChromaDB at {config.CHROMA_DB_DIR}...")
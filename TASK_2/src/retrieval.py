@@ -2,10 +2,10 @@ import os
 import sys
 import pandas as pd
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_experimental.agents import create_pandas_dataframe_agent
 from langchain_community.chat_models import ChatOllama
 import src.config as config
+from src.embeddings import get_embeddings
 from src.ingest_structured import load_employee_master, load_leave_data
 from src.ingest_semi_structured import load_attendance_logs
 
@@ -18,7 +18,7 @@ ATTENDANCE_JSON = os.path.join(BASE_DIR, "attendance_logs_detailed.json")
 class RetrievalManager:
     def __init__(self):
         print("Initializing RetrievalManager...")
-        self.embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME)
+        self.embeddings = get_embeddings()
         
         # ChromaDB Connection
         print(f"Loading ChromaDB from {config.CHROMA_DB_DIR}...")
@@ -0,0 +1,243 @@
+"""
+Offline end-to-end throughput benchmark for the NewsStream pipeline.
+
+Generated RSS feeds, article pages and a stub chat-completions endpoint are served from a
+local HTTP server (benchmarks/fixtures.py); articles are stored in mongomock, or in a
+throwaway database on --mongo-uri. Each corpus size runs in its own process so the
+reported peak RSS belongs to that size alone.
+
+    python benchmarks/bench_pipeline.py --sizes 100 1000 10000 --llm-latency 0.05 --error-rate 0.02
+
+Results are written as JSON (default: benchmarks/results/pipeline_<UTC timestamp>.json).
+Install with `pip install -r requirements-bench.txt` (project requirements plus mongomock).
+"""
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from bench_utils import peak_rss_mb, percentiles, timed, run_metadata, default_output
+from fixtures import FixtureServer, TOPICS
+
+QUERY_TEMPLATES = ["latest {} news", "what happened with the {}", "any updates on {} today", "{} and {} this week"]
+
+
+def stage(name, items, seconds):
+    return {"stage": name, "items": items, "seconds": round(seconds, 3),
+            "items_per_s": round(items / seconds, 2) if seconds > 0 else None}
+
+
+class HashEmbedder:
+    """
+    Deterministic stand-in for the SentenceTransformer (CRC32-hashed bag of words, stable
+    across processes unlike str hash), for runs that should not depend on the model
+    download or measure encode cost.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        rows = np.zeros((1 if single else len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(rows, [texts] if single else texts):
+            for word in text.lower().split():
+                row[zlib.crc32(word.encode()) % self.dim] += 1.0
+        return rows[0] if single else rows
+
+
+def build_queries(count, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [w for topic in TOPICS.values() for w in topic]
+    queries = []
+    for i in range(count):
+        template = QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)]
+        picks = rng.choice(words, size=template.count("{}"), replace=False)
+        queries.append(f"{template.format(*picks)} #{i}")  # unique text, so no cache hits
+    return queries
+
+
+def run_size(size, args, base_url, workdir):
+    """
+    One benchmark run in a fresh process: stages in isolation, then the streaming pipeline.
+    """
+    os.chdir(workdir)  # relative outputs (ingestion.log, default caches) stay in the scratch dir
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+    import utils_embeddings
+    import instrumentation
+    from dedup import NearDuplicateIndex
+    from embedding_cache import EmbeddingCache
+    from ingest_rss import RSSIngester
+    from pipeline import StreamingPipeline
+    from process_llm import ArticleProcessor, embed_articles
+    from rag_engine import RAGEngine
+    from store_mongo import MongoStore
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.embedder == "hash":
+        utils_embeddings._model = HashEmbedder()
+    utils_embeddings._cache = EmbeddingCache(os.path.join(workdir, "embeddings.sqlite3"), utils_embeddings.embedding_model_id())
+
+    if args.mongo_uri:
+        import pymongo
+        client = pymongo.MongoClient(args.mongo_uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    db_name = f"newsstream_bench_{os.getpid()}"
+
+    # Split `size` entries over feeds of at most --entries-per-feed items
+    n_feeds = math.ceil(size / args.entries_per_feed)
+    categories = list(TOPICS)
+    feeds = {}
+    for feed in range(n_feeds):
+        count = min(args.entries_per_feed, size - feed * args.entries_per_feed)
+        feeds.setdefault(categories[feed % len(categories)], []).append(f"{base_url}/feeds/{feed}/{count}.xml")
+
+    def make_ingester(store, name):
+        return RSSIngester(feeds=feeds, concurrent=True, per_host_delay=0, entries_per_feed=args.entries_per_feed,
+                           store=store, validators_path=os.path.join(workdir, f"{name}_validators.json"),
+                           skip_known_links=False)
+
+    def make_processor(name):
+        dedup = NearDuplicateIndex(os.path.join(workdir, f"{name}_dedup.sqlite3"))
+        return ArticleProcessor(concurrency=args.llm_concurrency, dedup=dedup, batch=not args.no_llm_batch)
+
+    try:
+        result = {"size": size, "stages": []}
+
+        # --- Stages in isolation ---
+        store = MongoStore(db_name=db_name, collection_name="stages", client=client)
+        articles, seconds = timed(make_ingester(store, "stages").ingest_feeds)
+        result["stages"].append(stage("fetch", len(articles), seconds))
+
+        processor = make_processor("stages")
+        _, seconds = timed(lambda: processor.enrich_unique(articles, store))
+        result["stages"].append(stage("enrich", len(articles), seconds))
+
+        to_embed = [a for a in articles if not a.get('duplicate_of')]
+        _, seconds = timed(lambda: embed_articles(to_embed))
+        result["stages"].append(stage("embed", len(to_embed), seconds))
+
+        _, seconds = timed(lambda: store.store_articles(articles))
+        result["stages"].append(stage("store", len(articles), seconds))
+
+        _, seconds = timed(store.get_vector_index)
+        result["stages"].append(stage("vector_index_load", len(store.vector_index), seconds))
+        _, seconds = timed(store.get_lexical_index)
+        result["stages"].append(stage("bm25_index_load", len(store.lexical_index), seconds))
+        result["duplicates"] = len(articles) - len(to_embed)
+
+        # --- Queries ---
+        engine = RAGEngine(store)
+        queries = build_queries(args.queries)
+        result["queries"] = {}
+        for mode in ("dense", "lexical", "hybrid"):
+            samples = []
+            for query in queries:
+                _, seconds = timed(lambda: engine.retrieve(query, mode=mode))
+                samples.append(seconds)
+            result["queries"][f"retrieve_{mode}"] = percentiles(samples)
+        samples = []
+        for query in queries[:args.answer_queries]:
+            _, seconds = timed(lambda: engine.answer_query(query))
+            samples.append(seconds)
+        result["queries"]["answer_query"] = percentiles(samples)
+
+        # --- Streaming pipeline, end to end on an empty collection ---
+        pipeline_store = MongoStore(db_name=db_name, collection_name="pipeline", client=client)
+        pipeline = StreamingPipeline(store=pipeline_store, ingester=make_ingester(pipeline_store, "pipeline"),
+                                     processor=make_processor("pipeline"))
+        report = pipeline.run()
+        stored = report["stored"]["inserted"] + report["stored"]["updated"]
+        result["pipeline"] = {
+            "elapsed_s": report["elapsed_s"],
+            "articles_per_s": round(stored / report["elapsed_s"], 2) if report["elapsed_s"] else None,
+            "stages": report["stages"],
+            "stored": report["stored"]
+        }
+
+        result["instrumentation"] = [
+            {key: h[key] for key in ("name", "labels", "count", "p50", "p95", "max")}
+            for h in instrumentation.REGISTRY.snapshot()["histograms"]
+        ]
+        result["counters"] = instrumentation.REGISTRY.snapshot()["counters"]
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+    finally:
+        if args.mongo_uri:
+            client.drop_database(db_name)
+
+
+def _child(size, args, base_url, workdir, results):
+    try:
+        results.put(run_size(size, args, base_url, workdir))
+    except Exception as e:
+        logging.exception(f"Benchmark run for {size} articles failed")
+        results.put({"size": size, "error": repr(e)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline NewsStream pipeline benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--entries-per-feed", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of LLM requests answered with 429")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--no-llm-batch", action="store_true", help="One LLM request per article")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="'model' uses the configured embedding backend, 'hash' a cheap stand-in")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--answer-queries", type=int, default=20)
+    parser.add_argument("--mongo-uri", default=None, help="Use a real mongod (a temporary database) instead of mongomock")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    server = FixtureServer(llm_latency=args.llm_latency, error_rate=args.error_rate)
+    base_url = server.start()
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory(prefix="newsstream_bench_") as workdir:
+                before = server.snapshot()
+                results = ctx.Queue()
+                process = ctx.Process(target=_child, args=(size, args, base_url, workdir, results))
+                process.start()
+                result = results.get()
+                process.join()
+                after = server.snapshot()
+                result["server"] = {key: after[key] - before[key] for key in after}
+                runs.append(result)
+                summary = {s["stage"]: s["items_per_s"] for s in result.get("stages", [])}
+                print(f"{size:>6} articles: {summary} peak RSS {result.get('peak_rss_mb')} MB", flush=True)
+    finally:
+        server.stop()
+
+    report = {**run_metadata("pipeline", vars(args)), "runs": runs}
+    output = args.output or default_output("pipeline")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
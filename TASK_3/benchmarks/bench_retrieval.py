@@ -0,0 +1,303 @@
+"""
+Retrieval latency / recall benchmark on synthetic embedding corpora.
+
+For each corpus size a clustered set of unit vectors (topics + noise, like real article
+embeddings) and a held-out query set are generated; the exact top-k from a brute-force
+matrix product is the ground truth. Compared per size:
+
+    python_loop   the original per-document cosine_similarity loop (on a query subset)
+    exact         VectorIndex(mode="exact")
+    exact_subset  exact search restricted to a 10% key subset (date-scoped queries)
+    ivf           VectorIndex(mode="ivf") for each --nprobe value
+    rag_*         RAGEngine.retrieve end to end over an in-memory store, for each --modes value
+
+For the lexical and hybrid modes every vector also gets a short synthetic text: words from
+its topic's vocabulary plus shared filler. Recall is still measured against the exact dense
+top-k, so it shows how much the BM25 candidate stage agrees with (or loses against) dense search.
+
+Each size runs in its own process (peak RSS per size). No network or MongoDB needed.
+
+    python benchmarks/bench_retrieval.py --sizes 10000 100000 1000000 --queries 200 --top-k 5
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from bench_utils import peak_rss_mb, current_rss_mb, percentiles, timed, run_metadata, default_output
+
+
+def synthetic_corpus(size, dim, topics, noise, seed=0, chunk=100_000):
+    """
+    Unit vectors drawn around `topics` random centres. Returns (matrix, topic centres, topic per row).
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    matrix = np.empty((size, dim), dtype=np.float32)
+    labels = rng.integers(0, topics, size)
+    for start in range(0, size, chunk):
+        end = min(size, start + chunk)
+        rows = centres[labels[start:end]]
+        rows = rows + noise * rng.standard_normal((end - start, dim)).astype(np.float32) / np.sqrt(dim)
+        matrix[start:end] = rows / np.linalg.norm(rows, axis=1, keepdims=True)
+    return matrix, centres, labels
+
+
+def synthetic_queries(centres, count, noise, seed=1):
+    """
+    Query vectors around random topic centres. Returns (queries, topic per query).
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, len(centres), count)
+    rows = centres[labels]
+    rows = rows + noise * rng.standard_normal(rows.shape).astype(np.float32) / np.sqrt(rows.shape[1])
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32), labels
+
+
+def synthetic_texts(labels, topic_words, filler_words, seed, vocabulary=8, filler=2000):
+    """
+    One text per label: `topic_words` words from that topic's vocabulary and `filler_words`
+    from a shared filler vocabulary.
+    """
+    rng = np.random.default_rng(seed)
+    topic_picks = rng.integers(0, vocabulary, (len(labels), topic_words))
+    filler_picks = rng.integers(0, filler, (len(labels), filler_words))
+    return [" ".join([f"t{label}w{j}" for j in topic_row] + [f"f{j}" for j in filler_row])
+            for label, topic_row, filler_row in zip(labels.tolist(), topic_picks.tolist(), filler_picks.tolist())]
+
+
+def exact_top_k(matrix, queries, top_k, rows=None, chunk=50_000):
+    """
+    Ground truth: exact top-k row ids per query by brute force, all queries per chunk of rows.
+    """
+    candidates = np.arange(matrix.shape[0]) if rows is None else np.asarray(rows)
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(candidates), chunk):
+        ids = candidates[start:start + chunk]
+        block = matrix[start:start + chunk] if rows is None else matrix[ids]
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        ids = np.concatenate([best_ids, np.broadcast_to(ids, (len(queries), len(ids)))], axis=1)
+        keep = np.argsort(-scores, axis=1)[:, :top_k]
+        best_ids = np.take_along_axis(ids, keep, axis=1)
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+    return [set(row.tolist()) for row in best_ids]
+
+
+def recall(results, truth, top_k):
+    return round(float(np.mean([len(set(found) & expected) / top_k for found, expected in zip(results, truth)])), 4)
+
+
+class InMemoryStore:
+    """
+    Stand-in for MongoStore exposing what RAGEngine.retrieve uses (no date ranges).
+    """
+
+    def __init__(self, vector_index, docs, lexical_index=None):
+        self.vector_index = vector_index
+        self.lexical_index = lexical_index
+        self.docs = docs
+        self.write_version = 0
+
+    def sync(self):
+        return False
+
+    def get_vector_index(self):
+        return self.vector_index
+
+    def get_lexical_index(self):
+        return self.lexical_index
+
+    def get_links_in_range(self, start=None, end=None, category=None, sentiment=None):
+        return list(self.docs)
+
+    def get_articles_by_links(self, links, fields=None):
+        return [self.docs[link] for link in links if link in self.docs]
+
+
+def measure(name, search, queries, truth, top_k, extra=None):
+    """
+    Runs `search` over every query (vector or text) and summarizes latency and recall@k.
+    """
+    results, samples = [], []
+    for q in queries:
+        found, seconds = timed(lambda: search(q))
+        results.append(found)
+        samples.append(seconds)
+    entry = {"method": name, **percentiles(samples), "recall_at_k": recall(results, truth, top_k)}
+    entry.update(extra or {})
+    logging.info(f"{name}: p50 {entry['p50_ms']} ms, p99 {entry['p99_ms']} ms, recall@{top_k} {entry['recall_at_k']}")
+    return entry
+
+
+def run_size(size, args):
+    import config
+    from bm25_index import BM25Index
+    from rag_engine import RAGEngine, cosine_similarity, normalize_query
+    from vector_index import VectorIndex
+
+    logging.getLogger().setLevel(logging.INFO)
+    result = {"size": size, "dim": args.dim, "top_k": args.top_k, "rss_start_mb": current_rss_mb(), "methods": []}
+
+    (matrix, centres, labels), seconds = timed(lambda: synthetic_corpus(size, args.dim, args.topics, args.noise))
+    queries, query_labels = synthetic_queries(centres, args.queries, args.noise)
+    result["generate_s"] = round(seconds, 3)
+    result["corpus_mb"] = round(matrix.nbytes / 2 ** 20, 1)
+    keys = [f"https://bench.local/article/{i}" for i in range(size)]
+    row_of = {key: i for i, key in enumerate(keys)}
+
+    truth, seconds = timed(lambda: exact_top_k(matrix, queries, args.top_k))
+    result["ground_truth_s"] = round(seconds, 3)
+    to_rows = lambda hits: [row_of[key] for key, _ in hits]
+
+    # Original path: one cosine_similarity call per stored document, then a full sort
+    loop_queries = queries[:args.loop_queries]
+
+    def python_loop(q):
+        scored = [(i, cosine_similarity(q, vector)) for i, vector in enumerate(matrix)]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [i for i, _ in scored[:args.top_k]]
+
+    if size <= args.loop_max_size and loop_queries.size:
+        result["methods"].append(measure("python_loop", python_loop, loop_queries, truth[:len(loop_queries)], args.top_k))
+
+    docs = {key: {"link": key, "title": f"Article {i}"} for i, key in enumerate(keys)}
+    lexical = None
+    if set(args.modes) & {"lexical", "hybrid"}:
+        def build_bm25():
+            index = BM25Index()
+            for key, text in zip(keys, synthetic_texts(labels, args.doc_topic_words, args.doc_filler_words, seed=3)):
+                index.upsert(key, text)
+            return index
+        lexical, seconds = timed(build_bm25)
+        result["bm25_build_s"] = round(seconds, 3)
+        result["rss_after_bm25_mb"] = current_rss_mb()
+
+    engine = RAGEngine(InMemoryStore(None, docs, lexical))
+    # Unique per query (the query embedding cache is keyed on the text); q<i> matches no document
+    texts = [f"{text} q{i}" for i, text in enumerate(synthetic_texts(query_labels, 2, 0, seed=4))]
+    for text, q in zip(texts, queries):
+        engine.query_embeddings.set(normalize_query(text), q.tolist())  # skip the embedding model
+
+    def rag_search(mode):
+        return lambda text: [row_of[doc['link']] for doc in engine.retrieve(text, top_k=args.top_k, mode=mode)]
+
+    # Each index lives only inside its helper, so it is freed before the next one is built
+    # and the rss_mb figures don't carry the previous index
+    def measure_exact():
+        exact = VectorIndex(mode="exact")
+        _, build_s = timed(lambda: exact.upsert(keys, matrix))
+        result["methods"].append(measure(
+            "exact", lambda q: to_rows(exact.search(q, top_k=args.top_k)), queries, truth, args.top_k,
+            {"build_s": round(build_s, 3), "index_mb": round(exact.nbytes / 2 ** 20, 1), "rss_mb": current_rss_mb()}
+        ))
+
+        # Exact search over a key subset, as for date-scoped questions
+        rng = np.random.default_rng(2)
+        subset_rows = np.sort(rng.choice(size, max(args.top_k, size // 10), replace=False))
+        subset_keys = [keys[i] for i in subset_rows]
+        subset_truth = exact_top_k(matrix, queries, args.top_k, rows=subset_rows)
+        result["methods"].append(measure(
+            "exact_subset", lambda q: to_rows(exact.search(q, top_k=args.top_k, keys=subset_keys)),
+            queries, subset_truth, args.top_k, {"subset_size": len(subset_keys)}
+        ))
+
+        engine.store.vector_index = exact
+        for mode in args.modes:
+            result["methods"].append(measure(f"rag_{mode}(exact)", rag_search(mode), texts, truth, args.top_k))
+        engine.store.vector_index = None
+
+    # Approximate IVF index, one training, several probe counts
+    def measure_ivf(nlist):
+        ivf = VectorIndex(mode="ivf", nlist=nlist, nprobe=args.nprobe[0])
+        _, build_s = timed(lambda: ivf.upsert(keys, matrix))
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            result["methods"].append(measure(
+                f"ivf(nlist={nlist},nprobe={nprobe})", lambda q: to_rows(ivf.search(q, top_k=args.top_k)),
+                queries, truth, args.top_k,
+                {"build_s": round(build_s, 3), "index_mb": round(ivf.nbytes / 2 ** 20, 1), "rss_mb": current_rss_mb()}
+            ))
+        if nlist == config.VECTOR_INDEX_NLIST or nlist == args.nlist[-1]:
+            ivf.nprobe = config.VECTOR_INDEX_NPROBE
+            engine.store.vector_index = ivf
+            # Lexical mode never touches the vector index, so it is only measured once with exact
+            for mode in [m for m in args.modes if m != "lexical"]:
+                result["methods"].append(measure(f"rag_{mode}(ivf nlist={nlist},nprobe={ivf.nprobe})",
+                                                 rag_search(mode), texts, truth, args.top_k))
+            engine.store.vector_index = None
+
+    measure_exact()
+    for nlist in args.nlist:
+        measure_ivf(nlist)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _child(size, args, results):
+    try:
+        results.put(run_size(size, args))
+    except Exception as e:
+        logging.exception(f"Retrieval benchmark for {size} vectors failed")
+        results.put({"size": size, "error": repr(e)})
+
+
+def main():
+    import config
+
+    parser = argparse.ArgumentParser(description="Retrieval latency / recall benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 embeddings are 384-d")
+    parser.add_argument("--topics", type=int, default=500, help="Cluster centres in the synthetic corpus")
+    parser.add_argument("--noise", type=float, default=1.0, help="Spread of vectors around their topic")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--loop-queries", type=int, default=10, help="Queries run through the slow Python loop")
+    parser.add_argument("--loop-max-size", type=int, default=1_000_000, help="Skip the Python loop above this size")
+    parser.add_argument("--nlist", type=int, nargs="+", default=[config.VECTOR_INDEX_NLIST])
+    parser.add_argument("--nprobe", type=int, nargs="+",
+                        default=[config.VECTOR_INDEX_NPROBE // 2, config.VECTOR_INDEX_NPROBE, config.VECTOR_INDEX_NPROBE * 2])
+    parser.add_argument("--modes", nargs="+", choices=["dense", "lexical", "hybrid"], default=["dense", "hybrid"],
+                        help="RAGEngine.retrieve modes measured end to end; lexical/hybrid build a BM25 index "
+                             "(a few KB of RAM per document)")
+    parser.add_argument("--doc-topic-words", type=int, default=4, help="Topic words in each synthetic document text")
+    parser.add_argument("--doc-filler-words", type=int, default=12, help="Filler words in each synthetic document text")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for size in args.sizes:
+        results = ctx.Queue()
+        process = ctx.Process(target=_child, args=(size, args, results))
+        process.start()
+        result = results.get()
+        process.join()
+        runs.append(result)
+        for method in result.get("methods", []):
+            print(f"{size:>8} {method['method']:<28} p50 {method['p50_ms']:>9} ms  p99 {method['p99_ms']:>9} ms  "
+                  f"recall@{args.top_k} {method['recall_at_k']}", flush=True)
+        if "error" in result:
+            print(f"{size:>8} failed: {result['error']}", flush=True)
+
+    report = {**run_metadata("retrieval", vars(args)), "runs": runs}
+    output = args.output or default_output("retrieval")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
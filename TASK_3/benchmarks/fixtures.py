@@ -0,0 +1,194 @@
+
+import json
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# Topic words per category so generated articles (and benchmark queries) have something to match
+TOPICS = {
+    "World News": ["election", "summit", "minister", "border", "treaty", "embassy", "parliament", "refugees"],
+    "Technology": ["chip", "startup", "software", "smartphone", "cloud", "robotics", "semiconductor", "encryption"],
+    "Business & Economy": ["inflation", "earnings", "markets", "bank", "stocks", "merger", "tariffs", "investors"],
+    "Health & Science": ["vaccine", "hospital", "study", "climate", "species", "telescope", "genome", "trial"],
+    "Sports": ["match", "league", "goal", "tournament", "coach", "championship", "striker", "olympics"],
+    "Entertainment": ["film", "album", "festival", "actor", "series", "premiere", "concert", "awards"],
+}
+FILLER = ("the a of to and in on for with as by at from said after over new year people report officials "
+          "week government company local national first last two three according while during").split()
+
+_IDS = re.compile(r"^\s*\[(\d+)\] Title", re.M)
+
+
+def topic_words(feed):
+    categories = list(TOPICS)
+    return categories[feed % len(categories)], TOPICS[categories[feed % len(categories)]]
+
+
+def article_paragraphs(feed, index, words=320):
+    """
+    Deterministic pseudo-random article text for one (feed, entry) pair.
+    """
+    rng = random.Random(feed * 1_000_003 + index)
+    _, topic = topic_words(feed)
+    tokens = [rng.choice(topic) if rng.random() < 0.12 else rng.choice(FILLER) for _ in range(words)]
+    # A unique token per article keeps near-duplicate detection from collapsing the corpus
+    tokens.insert(rng.randrange(words), f"ref{feed}x{index}")
+    return [" ".join(tokens[i:i + 40]) + "." for i in range(0, len(tokens), 40)]
+
+
+class FixtureServer:
+    """
+    Local HTTP server standing in for RSS publishers and the chat-completions API.
+
+        /feeds/<feed>/<count>.xml        RSS feed with `count` entries
+        /articles/<feed>/<index>.html    article page for one entry
+        .../chat/completions             stub LLM (latency + injected 429s)
+    """
+
+    def __init__(self, llm_latency=0.05, error_rate=0.0, seed=0):
+        self.llm_latency = llm_latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.stats = {"feed_requests": 0, "article_requests": 0, "llm_requests": 0, "llm_429": 0}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feed_url(self, feed, count):
+        return f"{self.base_url}/feeds/{feed}/{count}.xml"
+
+    def start(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like real publishers
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fixture.handle_get(self)
+
+            def do_POST(self):
+                fixture.handle_post(self)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    # --- Responses ---
+
+    @staticmethod
+    def _send(handler, status, body, content_type, headers=None):
+        payload = body.encode('utf-8') if isinstance(body, str) else body
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def handle_get(self, handler):
+        match = re.fullmatch(r"/feeds/(\d+)/(\d+)\.xml", handler.path)
+        if match:
+            self._count("feed_requests")
+            return self._send(handler, 200, self.render_feed(int(match.group(1)), int(match.group(2))),
+                              "application/rss+xml; charset=utf-8")
+        match = re.fullmatch(r"/articles/(\d+)/(\d+)\.html", handler.path)
+        if match:
+            self._count("article_requests")
+            return self._send(handler, 200, self.render_article(int(match.group(1)), int(match.group(2))),
+                              "text/html; charset=utf-8")
+        self._send(handler, 404, "not found", "text/plain")
+
+    def render_feed(self, feed, count):
+        category, _ = topic_words(feed)
+        now = time.time()
+        items = []
+        for index in range(count):
+            summary = article_paragraphs(feed, index)[0]
+            items.append(
+                f"<item><title>{escape(category)} story {feed}-{index}</title>"
+                f"<link>{self.base_url}/articles/{feed}/{index}.html</link>"
+                f"<pubDate>{formatdate(now - index * 600, usegmt=True)}</pubDate>"
+                f"<description>{escape(summary)}</description></item>"
+            )
+        return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Fixture feed {feed}</title><link>{self.base_url}</link>"
+                f"<description>Generated</description>{''.join(items)}</channel></rss>")
+
+    def render_article(self, feed, index):
+        paragraphs = "".join(f"<p>{escape(p)}</p>" for p in article_paragraphs(feed, index))
+        nav = "".join(f'<li><a href="/x/{i}">Section {i}</a></li>' for i in range(30))
+        return (f"<!DOCTYPE html><html><head><title>Story {feed}-{index}</title>"
+                f"<script>var tracking = {{}};</script></head><body><nav><ul>{nav}</ul></nav>"
+                f"<article><h1>Story {feed}-{index}</h1>{paragraphs}</article>"
+                f"<footer><p>Copyright fixture</p></footer></body></html>")
+
+    def handle_post(self, handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        if not handler.path.endswith("/chat/completions"):
+            return self._send(handler, 404, "not found", "text/plain")
+
+        self._count("llm_requests")
+        if self.llm_latency:
+            time.sleep(self.llm_latency)
+        with self._lock:
+            throttled = self.rng.random() < self.error_rate
+            if throttled:
+                self.stats["llm_429"] += 1
+        if throttled:
+            error = {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}
+            return self._send(handler, 429, json.dumps(error), "application/json", {"Retry-After": "0"})
+
+        request = json.loads(body or b"{}")
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        content = self.completion_content(prompt)
+        response = {
+            "id": f"chatcmpl-{self.stats['llm_requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4}
+        }
+        self._send(handler, 200, json.dumps(response), "application/json")
+
+    @staticmethod
+    def completion_content(prompt):
+        ids = [int(i) for i in _IDS.findall(prompt)]
+        if ids:
+            return json.dumps({"results": [
+                {"id": i, "summary": f"Stub summary for article {i}.", "category": "Technology", "sentiment": "Neutral"}
+                for i in ids
+            ]})
+        if "News Context" in prompt:
+            return "Stub answer based on the provided news context."
+        return json.dumps({"summary": "Stub summary.", "category": "Technology", "sentiment": "Neutral"})
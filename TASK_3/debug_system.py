@@ -11,6 +11,7 @@ try:
     from config import MONGO_URI, DB_NAME, COLLECTION_NAME
     from utils_embeddings import get_embedding
     from rag_engine import RAGEngine, cosine_similarity
+    from embedding_codec import decode_embedding, has_embedding
 except ImportError as e:
     print(f"Import Error: {e}")
     sys.exit(1)
@@ -44,10 +45,10 @@ def diagnose():
 
         # 3. Check Embeddings
         sample_doc = collection.find_one()
-        if 'embedding' not in sample_doc or not sample_doc['embedding']:
+        if not has_embedding(sample_doc.get('embedding')):
             print("ERROR: Sample document has no embedding!")
         else:
-            emb_len = len(sample_doc['embedding'])
+            emb_len = len(decode_embedding(sample_doc['embedding']))
             print(f"Sample document has embedding of length: {emb_len}")
             
         # 4. Test Local Embedding Generation
@@ -69,7 +70,7 @@ def diagnose():
             scored_candidates = []
             for doc in candidates:
                 try:
-                    score = cosine_similarity(query_emb, doc['embedding'])
+                    score = cosine_similarity(query_emb, decode_embedding(doc['embedding']))
                     scored_candidates.append((score, doc['title']))
                 except Exception as e:
                     pass
@@ -0,0 +1,107 @@
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+what which who whom when where why how about news latest any me tell give show
+""".split())
+
+
+def tokenize(text):
+    """
+    Lowercased alphanumeric tokens with common English and question words removed.
+    """
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses several ranked key lists into one ordering: score(key) = sum 1 / (k + rank).
+    Returns [(key, score)] best first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Incrementally maintained inverted index with Okapi BM25 scoring, keyed by article link.
+    Only postings of the query terms are touched, so query cost depends on how common
+    the terms are, not on the corpus size.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)   # term -> {key: term frequency}
+        self._doc_terms = {}                 # key -> Counter of terms
+        self._doc_lengths = {}               # key -> token count
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def __contains__(self, key):
+        return key in self._doc_terms
+
+    def upsert(self, key, text):
+        with self._lock:
+            self._remove(key)
+            terms = Counter(tokenize(text))
+            if not terms:
+                return
+            self._doc_terms[key] = terms
+            self._doc_lengths[key] = sum(terms.values())
+            self._total_length += self._doc_lengths[key]
+            for term, tf in terms.items():
+                self._postings[term][key] = tf
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key):
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(key)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query, top_k=100, keys=None):
+        """
+        Returns up to `top_k` (key, score) pairs, best first. `keys` optionally restricts the candidates.
+        """
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if n_docs == 0:
+                return []
+            allowed = set(keys) if keys is not None else None
+            avg_length = self._total_length / n_docs
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for key, tf in postings.items():
+                    if allowed is not None and key not in allowed:
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_lengths[key] / avg_length)
+                    scores[key] += idf * tf * (self.k1 + 1) / norm
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            return ranked[:top_k]
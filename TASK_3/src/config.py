@@ -35,18 +35,105 @@ RSS_FEEDS = {
     ]
 }
 
+# Ingestion Configuration
+INGEST_CONCURRENT = True  # Fetch feeds and articles with a bounded thread pool
+INGEST_MAX_WORKERS = 8  # Global concurrency limit
+INGEST_PER_HOST_DELAY = 1.0  # Minimum seconds between requests to the same host
+INGEST_ENTRIES_PER_FEED = 5  # Latest entries taken from each feed
+FEED_TIMEOUT = 10  # Seconds
+ARTICLE_TIMEOUT = 10  # Seconds
+ARTICLE_MAX_BYTES = 2_000_000  # Stop downloading article pages beyond this size
+ARTICLE_HTML_PARSER = "lxml"  # BeautifulSoup parser used for full-text extraction
+ARTICLE_MIN_TEXT_CHARS = 200  # Less text than this from a host's cached extraction profile triggers re-detection
+ARTICLE_PROFILE_MAX_USES = 50  # Pages extracted with a cached profile before it is re-detected anyway
+FEED_VALIDATORS_PATH = "data/cache/feed_validators.json"  # ETag / Last-Modified per feed
+FEED_VALIDATORS_PENDING_PATH = "data/cache/feed_validators_pending.json"  # Staged by the ingest CLI, committed by the store CLI
+SKIP_KNOWN_LINKS = True  # Don't refetch articles already stored in MongoDB
+
+# Streaming Pipeline Configuration
+PIPELINE_QUEUE_SIZE = 50  # Max articles buffered between two stages
+PIPELINE_BATCH_SIZE = 16  # Max articles per enrich/embed/store micro-batch
+PIPELINE_BATCH_WAIT = 0.5  # Seconds a stage waits to fill a micro-batch
+
 # Database Configuration
 MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "news_stream_db"
 COLLECTION_NAME = "articles"
+MONGO_BULK_BATCH_SIZE = 500  # Upserts per bulk_write
+STORE_META_COLLECTION_NAME = "store_meta"  # Shared write counters, so other processes notice new writes
+STORE_SYNC_INTERVAL = 30  # Seconds between checks for writes made by other processes (e.g. a standalone scheduler)
+
+# Retention Configuration
+RETENTION_HOT_DAYS = 30  # Articles published earlier move to the archive collection (0 = keep everything hot)
+RETENTION_INTERVAL_SECONDS = 3600  # How often the scheduler runs the archive job
+ARCHIVE_COLLECTION_NAME = "articles_archive"
+ARCHIVE_BLOCK_COMPRESSOR = "zstd"  # WiredTiger compression for the archive ("snappy", "zlib" or "zstd")
+ARCHIVE_QUERY_MAX_DOCS = 10000  # Archived articles (newest first) scored for one date-scoped question
+ARCHIVE_INDEX_CACHE_SIZE = 4  # Per-date-range archive indexes kept in memory
 
 # LLM Configuration
 LLM_PROVIDER = "groq"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = "llama-3.3-70b-versatile" 
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None  # Override to point at a local stub server
+LLM_MAX_CONCURRENCY = 4  # In-flight enrichment requests (1 = serial)
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE = 1.0  # Seconds, doubled per retry (with jitter)
+LLM_BACKOFF_MAX = 30.0  # Seconds
+INCREMENTAL_PROCESSING = True  # Reuse stored enrichment for unchanged articles
+LLM_BATCH_ENABLED = True  # Enrich several articles per request (JSON array keyed by id)
+LLM_BATCH_TOKEN_BUDGET = 6000  # Estimated prompt tokens per batched request
+LLM_BATCH_MAX_ARTICLES = 8
+LLM_BATCH_ARTICLE_CHARS = 2000  # Per-article text sent in batched mode
+
+# Near-Duplicate Detection
+DEDUP_ENABLED = True  # Syndicated copies inherit the first copy's enrichment instead of a new LLM call
+DEDUP_INDEX_PATH = "data/cache/dedup_signatures.sqlite3"  # Persistent SimHash signatures
+DEDUP_MAX_DISTANCE = 5  # Max differing bits (of 64) to count as the same story
+DEDUP_MIN_TOKENS = 50  # Shorter texts are never treated as duplicates
 
 # Embedding Configuration
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Lightweight local model
+EMBEDDING_DIM = 384  # Output size of EMBEDDING_MODEL, used before the model is loaded
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = "data/cache/embeddings.sqlite3"
+EMBEDDING_CACHE_MAX_ENTRIES = 50000
+EMBEDDING_STORAGE_DTYPE = "float32"  # MongoDB storage: "float32", "float16" or "int8"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" (SentenceTransformer), "onnx" or "onnx-int8" (ONNX Runtime, no torch import)
+EMBEDDING_ONNX_DIR = "data/models/all-MiniLM-L6-v2-onnx"  # Written by `python src/onnx_embedder.py export`
+EMBEDDING_ONNX_THREADS = 0  # ONNX Runtime intra-op threads (0 = runtime default)
+EMBEDDING_PARITY_MIN_COSINE = 0.99  # Lowest allowed cosine between ONNX and PyTorch vectors of the same text
+REPAIR_BATCH_SIZE = 256  # Documents read, encoded and written back per repair_embeddings page
+REPAIR_WORKERS = 0  # Encoder processes for repair_embeddings (0 = encode in-process)
+REPAIR_CHECKPOINT_PATH = "data/cache/repair_embeddings_checkpoint.json"  # Last repaired _id, for resuming
+
+# Vector Index Configuration
+VECTOR_INDEX_MODE = "exact"  # "exact" or "ivf" (approximate nearest neighbour)
+VECTOR_INDEX_NLIST = 64  # IVF clusters
+VECTOR_INDEX_NPROBE = 8  # IVF clusters scored per query
+
+# Retrieval Configuration
+RETRIEVAL_MODE = "hybrid"  # "dense", "lexical" (BM25) or "hybrid" (BM25 candidates + dense, fused)
+BM25_CANDIDATES = 100  # First-stage candidates passed to dense scoring in hybrid mode
+RRF_K = 60  # Reciprocal rank fusion constant
+
+# RAG Cache Configuration
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # LRU entries, keyed by normalized query text
+ANSWER_CACHE_TTL = 600  # Seconds; new writes to the store invalidate earlier
+ANSWER_CACHE_SIZE = 512
+
+# Dashboard Metrics Configuration
+METRICS_CACHE_TTL = 60  # Seconds; writes invalidate earlier
+METRICS_TIME_BUCKET_DAYS = 14
+
+# Instrumentation Configuration
+METRICS_SNAPSHOT_PATH = "data/metrics/metrics.json"  # JSON snapshot written after each pipeline run and CLI job
+METRICS_PROMETHEUS_PATH = "data/metrics/metrics.prom"  # Same metrics in Prometheus text format (textfile collector)
 
 # App Configuration
 UPDATE_INTERVAL_SECONDS = 300  # 5 minutes
+SCHEDULER_ENABLED = True  # Poll feeds in the background from the dashboard process
+SCHEDULER_MIN_INTERVAL = 60  # Seconds; busiest feeds are polled at most this often
+SCHEDULER_MAX_INTERVAL = 1800  # Seconds; quiet feeds are polled at least this often
+SCHEDULER_TICK_SECONDS = 5  # How often the scheduler checks for due feeds
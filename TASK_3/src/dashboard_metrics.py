@@ -0,0 +1,70 @@
+
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Ensure src is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    from config import METRICS_CACHE_TTL, METRICS_TIME_BUCKET_DAYS
+    from cache_utils import TTLCache
+except ImportError:
+    from src.config import METRICS_CACHE_TTL, METRICS_TIME_BUCKET_DAYS
+    from src.cache_utils import TTLCache
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+
+class DashboardMetrics:
+    """
+    Corpus-wide dashboard numbers computed with MongoDB aggregations.
+
+    Results are cached for `ttl` seconds and keyed on the store's write version,
+    so a store_articles call invalidates them immediately (writes from other processes
+    once MongoStore.sync notices them).
+    """
+
+    def __init__(self, store, ttl=METRICS_CACHE_TTL):
+        self.store = store
+        self.cache = TTLCache(ttl=ttl)
+
+    def _cached(self, name, compute):
+        self.store.sync()
+        key = (name, self.store.write_version)
+        value = self.cache.get(key)
+        if value is None:
+            value = compute()
+            self.cache.set(key, value)
+        return value
+
+    def overview(self):
+        """
+        Totals plus counts by category, sentiment and source feed (hot collection; archived
+        articles are only counted). Near-duplicates of a stored story are left out, like in retrieval.
+        """
+        def compute():
+            unique = {"duplicate_of": {"$exists": False}}
+            return {
+                "total": self.store.collection.count_documents(unique),
+                "archived": self.store.archive.estimated_document_count(),
+                "by_category": self.store.count_by("category", unique),
+                "by_sentiment": self.store.count_by("sentiment", unique),
+                "by_feed": self.store.count_by("source_url", unique),
+            }
+        return self._cached("overview", compute)
+
+    def daily_volume(self, days=METRICS_TIME_BUCKET_DAYS):
+        """
+        Articles ingested per day over the last `days` days, as {"YYYY-MM-DD": count}.
+        """
+        def compute():
+            cutoff = (datetime.now() - timedelta(days=days)).date().isoformat()
+            pipeline = [
+                {"$match": {"ingested_at": {"$gte": cutoff}}},
+                {"$group": {"_id": {"$substr": ["$ingested_at", 0, 10]}, "count": {"$sum": 1}}},
+                {"$sort": {"_id": 1}}
+            ]
+            return {row['_id']: row['count'] for row in self.store.collection.aggregate(pipeline)}
+        return self._cached(("daily_volume", days), compute)
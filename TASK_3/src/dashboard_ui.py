@@ -2,8 +2,6 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import threading
-import time
 import sys
 import os
 
@@ -12,27 +10,45 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 try:
-    from src.config import RSS_FEEDS
-    from src.ingest_rss import RSSIngester
-    from src.process_llm import ArticleProcessor
+    from src.config import RSS_FEEDS, SCHEDULER_ENABLED
+    from src.pipeline import StreamingPipeline
+    from src.scheduler import IngestionScheduler
     from src.store_mongo import MongoStore
     from src.rag_engine import RAGEngine
+    from src.dashboard_metrics import DashboardMetrics
+    from src import instrumentation
 except ImportError:
     # Fallback if running directly from src folder
     import sys
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from config import RSS_FEEDS
-    from ingest_rss import RSSIngester
-    from process_llm import ArticleProcessor
+    from config import RSS_FEEDS, SCHEDULER_ENABLED
+    from pipeline import StreamingPipeline
+    from scheduler import IngestionScheduler
     from store_mongo import MongoStore
     from rag_engine import RAGEngine
+    from dashboard_metrics import DashboardMetrics
+    import instrumentation
 
-# Initialize Components
-mongo_store = MongoStore()
-rag_engine = RAGEngine(mongo_store)
-
+# Must be the first Streamlit call: a cache-miss spinner in get_components() would otherwise come first
 st.set_page_config(page_title="NewsStream AI", layout="wide", page_icon="📰")
 
+# Initialize Components once per server process so the vector index stays resident across reruns
+@st.cache_resource
+def get_components():
+    store = MongoStore()
+    return store, RAGEngine(store), DashboardMetrics(store)
+
+mongo_store, rag_engine, dashboard_metrics = get_components()
+
+# One background ingestion scheduler per server process, shared by all sessions
+@st.cache_resource
+def get_scheduler(_store):
+    scheduler = IngestionScheduler(store=_store)
+    scheduler.start()
+    return scheduler
+
+scheduler = get_scheduler(mongo_store) if SCHEDULER_ENABLED else None
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -57,100 +73,139 @@ st.title("📰 NewsStream AI: Real-Time Intelligence")
 # Sidebar for controls
 with st.sidebar:
     st.header("Pipeline Controls")
-    if st.button("🔄 Trigger Ingestion Pipeline"):
+    if scheduler is not None:
+        # Ingestion runs in the background; the button only moves the next poll forward
+        sched_status = scheduler.status()
+        state = "🟢 Ingesting now" if sched_status['busy'] else ("🟢 Idle" if sched_status['running'] else "🔴 Stopped")
+        st.caption(f"Background ingestion: {state}")
+        if sched_status['next_poll_in_s'] is not None and not sched_status['busy']:
+            st.caption(f"Next feed poll in {sched_status['next_poll_in_s']}s · {sched_status['cycles']} cycles so far")
+        if st.button("🔄 Poll All Feeds Now"):
+            scheduler.trigger_now()
+            st.success("Ingestion queued in the background.")
+    elif st.button("🔄 Trigger Ingestion Pipeline"):
         with st.status("Running Pipeline...", expanded=True) as status:
-            # 1. Ingestion Phase
-            start_ingest = time.time()
-            st.write("1. Fetching RSS Feeds...")
-            ingester = RSSIngester()
-            articles = ingester.ingest_feeds()
-            ingester.save_raw_data(articles)
-            end_ingest = time.time()
-            
-            ingest_duration = end_ingest - start_ingest
-            ingest_speed = len(articles) / ingest_duration if ingest_duration > 0 else 0
-            
-            # Save to session state
-            st.session_state['last_ingest_speed'] = ingest_speed
-            st.session_state['last_ingest_count'] = len(articles)
-            
-            st.success(f"Fetched {len(articles)} articles in {ingest_duration:.2f}s")
-            
-            # 2. Processing Phase
-            if articles:
-                start_process = time.time()
-                st.write(f"2. Processing {len(articles)} Articles with LLM...")
-                processor = ArticleProcessor()
-                processor.process_batch()
-                end_process = time.time()
-                
-                process_duration = end_process - start_process
-                process_speed = len(articles) / process_duration if process_duration > 0 else 0
-                
-                # Save to session state
-                st.session_state['last_process_speed'] = process_speed
-                
-                st.success(f"AI Processing complete in {process_duration:.2f}s")
+            # Fetch, enrich, embed and store run as concurrent stages; articles become
+            # searchable while later ones are still being fetched
+            st.write("Fetching, processing and storing articles...")
+            pipeline = StreamingPipeline(store=mongo_store)
+            report = pipeline.run()
+            st.session_state['last_pipeline_report'] = report
+
+            if report['stages'][0]['items']:
+                st.success(f"Fetched {report['stages'][0]['items']} articles and stored "
+                           f"{report['stages'][-1]['items']} in {report['elapsed_s']:.2f}s")
+                st.dataframe(pd.DataFrame(report['stages']), hide_index=True)
             else:
                 st.warning("No articles to process.")
-            
-            # 3. Storage Phase
-            st.write("3. Storing and Indexing...")
-            mongo_store.store_articles()
-            
+
             status.update(label="Pipeline Complete!", state="complete", expanded=False)
 
     st.divider()
     
     # Performance Metrics Display
     st.header("⚡ System Performance")
-    if 'last_ingest_speed' in st.session_state:
+    last_report = scheduler.last_report if scheduler is not None else st.session_state.get('last_pipeline_report')
+    if last_report:
+        stages = {stage['stage']: stage for stage in last_report['stages']}
         st.metric(
             label="Ingestion Speed",
-            value=f"{st.session_state['last_ingest_speed']:.2f} arts/s",
-            delta=f"{st.session_state.get('last_ingest_count', 0)} articles"
+            value=f"{stages['fetch']['items_per_s']:.2f} arts/s",
+            delta=f"{stages['fetch']['items']} articles"
         )
-    
-    if 'last_process_speed' in st.session_state:
         st.metric(
             label="LLM Processing Speed",
-            value=f"{st.session_state['last_process_speed']:.2f} arts/s",
+            value=f"{stages['enrich']['items_per_s']:.2f} arts/s",
             help="Speed of Summarization + Classification + Sentiment Analysis"
         )
 
+    # Latency histograms and error counters recorded by every stage in this process
+    snapshot = instrumentation.REGISTRY.snapshot()
+    if snapshot['histograms'] or snapshot['counters']:
+        with st.expander("🔬 Instrumentation"):
+            latency = pd.DataFrame([
+                {
+                    "metric": h['name'].removesuffix('_seconds'),
+                    "labels": ", ".join(f"{k}={v}" for k, v in h['labels'].items()),
+                    "count": h['count'],
+                    "p50_ms": round(h['p50'] * 1000, 1) if h['p50'] is not None else None,
+                    "p95_ms": round(h['p95'] * 1000, 1) if h['p95'] is not None else None,
+                    "max_ms": round(h['max'] * 1000, 1)
+                }
+                for h in snapshot['histograms']
+            ])
+            if not latency.empty:
+                st.dataframe(latency, hide_index=True)
+            if snapshot['counters']:
+                st.dataframe(pd.DataFrame([
+                    {"counter": c['name'], "labels": ", ".join(f"{k}={v}" for k, v in c['labels'].items()),
+                     "value": c['value']}
+                    for c in snapshot['counters']
+                ]), hide_index=True)
+            st.download_button("Download Prometheus metrics", instrumentation.REGISTRY.to_prometheus(),
+                               file_name="newsstream_metrics.prom", mime="text/plain")
+
     st.divider()
     st.header("Active Feeds")
-    for cat, urls in RSS_FEEDS.items():
-        with st.expander(cat):
-            for url in urls:
-                st.caption(url)
+    if scheduler is not None:
+        feed_status = pd.DataFrame(scheduler.status()['feeds'])
+        for cat, group in feed_status.groupby('category', sort=False):
+            with st.expander(cat):
+                st.dataframe(group[['url', 'interval_s', 'last_new', 'next_run', 'last_error']], hide_index=True)
+    else:
+        for cat, urls in RSS_FEEDS.items():
+            with st.expander(cat):
+                for url in urls:
+                    st.caption(url)
 
 # Main Content Tabs
 tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "💬 AI Chatbot", "📡 Live Feed"])
 
 # Fetch Data
-data = mongo_store.get_recent_articles(limit=100)
+data = mongo_store.get_article_listing(limit=100)
 df = pd.DataFrame(data)
 
 with tab1:
-    if not df.empty:
+    # Corpus-wide counts from cached MongoDB aggregations (not the 100-row sample)
+    overview = dashboard_metrics.overview()
+    if overview['total']:
+        by_sentiment = overview['by_sentiment']
+        by_category = overview['by_category']
+
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Articles", len(df))
-        col2.metric("Positive Sentiment", len(df[df['sentiment'] == 'Positive']))
-        col3.metric("Political News", len(df[df['category'] == 'Political']))
-        col4.metric("Threatful", len(df[df['category'] == 'Threatful']))
+        col1.metric("Total Articles", overview['total'], help=f"Hot collection; {overview['archived']} older articles are archived")
+        col2.metric("Positive Sentiment", by_sentiment.get('Positive', 0))
+        col3.metric("Political News", by_category.get('Political', 0))
+        col4.metric("Threatful", by_category.get('Threatful', 0))
         
         row1_col1, row1_col2 = st.columns(2)
         
         with row1_col1:
             st.subheader("Sentiment Distribution")
-            fig_sent = px.pie(df, names='sentiment', hole=0.4, color_discrete_sequence=px.colors.sequential.RdBu)
+            fig_sent = px.pie(names=list(by_sentiment.keys()), values=list(by_sentiment.values()), hole=0.4, color_discrete_sequence=px.colors.sequential.RdBu)
             st.plotly_chart(fig_sent, use_container_width=True)
             
         with row1_col2:
             st.subheader("Category Breakdown")
-            fig_cat = px.bar(df, x='category', color='category', title="Articles by Category")
+            fig_cat = px.bar(x=list(by_category.keys()), y=list(by_category.values()), color=list(by_category.keys()),
+                             labels={'x': 'category', 'y': 'count', 'color': 'category'}, title="Articles by Category")
             st.plotly_chart(fig_cat, use_container_width=True)
+
+        row2_col1, row2_col2 = st.columns(2)
+
+        with row2_col1:
+            st.subheader("Volume by Feed")
+            by_feed = overview['by_feed']
+            fig_feed = px.bar(x=list(by_feed.values()), y=list(by_feed.keys()), orientation='h',
+                              labels={'x': 'count', 'y': 'feed'})
+            st.plotly_chart(fig_feed, use_container_width=True)
+
+        with row2_col2:
+            st.subheader("Articles Ingested per Day")
+            daily = dashboard_metrics.daily_volume()
+            fig_daily = px.line(x=list(daily.keys()), y=list(daily.values()), markers=True,
+                                labels={'x': 'day', 'y': 'count'})
+            st.plotly_chart(fig_daily, use_container_width=True)
     else:
         st.info("No data available. Please trigger the ingestion pipeline.")
 
@@ -0,0 +1,85 @@
+
+import calendar
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_published(value, parsed=None):
+    """
+    Parses an RSS `published` value (RFC 822, ISO 8601, ...) into an aware UTC datetime.
+    `parsed` is feedparser's `published_parsed` struct (already UTC) and wins when present.
+    Returns None if nothing can be parsed.
+    """
+    if parsed:
+        try:
+            return datetime.fromtimestamp(calendar.timegm(parsed), tz=timezone.utc)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    if isinstance(value, datetime):
+        result = value
+    elif not value or not isinstance(value, str):
+        return None
+    else:
+        text = value.strip()
+        result = None
+        try:
+            result = parsedate_to_datetime(text)
+        except (TypeError, ValueError, IndexError):
+            pass
+        if result is None:
+            try:
+                result = datetime.fromisoformat(text.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+    if result.tzinfo is None:
+        result = result.replace(tzinfo=timezone.utc)
+    return result.astimezone(timezone.utc)
+
+
+def to_iso(value):
+    """
+    ISO string for a datetime (JSON-friendly), or None.
+    """
+    return value.isoformat() if value else None
+
+
+def resolve_date_range(query, now=None):
+    """
+    Finds a date scope in a question and returns (start, end, label) as UTC datetimes
+    (end exclusive), or None. Understands YYYY-MM-DD, today, yesterday, last 24h,
+    last N hours/days, this/last week and this month.
+    """
+    now = now or datetime.now(timezone.utc)
+    text = query.lower()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    match = re.search(r"\b(\d{4}-\d{2}-\d{2})\b", text)
+    if match:
+        try:
+            day = datetime.strptime(match.group(1), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            return day, day + timedelta(days=1), match.group(1)
+        except ValueError:
+            pass
+
+    match = re.search(r"\b(?:last|past)\s+(\d+)\s*(h|hrs?|hours?|d|days?)\b", text)
+    if match:
+        amount = int(match.group(1))
+        delta = timedelta(hours=amount) if match.group(2).startswith('h') else timedelta(days=amount)
+        return now - delta, now, match.group(0)
+
+    if re.search(r"\b(?:last|past)\s+(?:24\s*h|day)\b", text):
+        return now - timedelta(hours=24), now, "last 24h"
+    if re.search(r"\btoday\b", text):
+        return midnight, now, "today"
+    if re.search(r"\byesterday\b", text):
+        return midnight - timedelta(days=1), midnight, "yesterday"
+
+    week_start = midnight - timedelta(days=midnight.weekday())
+    if re.search(r"\bthis\s+week\b", text):
+        return week_start, now, "this week"
+    if re.search(r"\blast\s+week\b", text):
+        return week_start - timedelta(days=7), week_start, "last week"
+    if re.search(r"\bthis\s+month\b", text):
+        return midnight.replace(day=1), now, "this month"
+    return None
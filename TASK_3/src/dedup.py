@@ -0,0 +1,154 @@
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=3):
+    words = _WORD.findall((text or "").lower())
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text):
+    """
+    64-bit SimHash over word 3-shingles. Near-identical texts differ in only a few bits.
+    """
+    weights = [0] * 64
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def bands(signature, count):
+    """
+    Splits a 64-bit signature into `count` equal bit ranges (leftover high bits are ignored).
+    """
+    width = 64 // count
+    mask = (1 << width) - 1
+    return [(signature >> (i * width)) & mask for i in range(count)]
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """
+    Persistent SimHash signature index (SQLite) for spotting the same story under different links.
+
+    Signatures are cut into `max_distance + 1` bands; two signatures within `max_distance`
+    bits must agree exactly on at least one band, so a lookup only compares against rows
+    that share a band (LSH) instead of the whole archive.
+    """
+
+    def __init__(self, path, max_distance=5, min_tokens=50):
+        self.path = path
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                link TEXT PRIMARY KEY,
+                signature INTEGER NOT NULL,
+                canonical TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                link TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_bands ON bands(band, value);
+            CREATE INDEX IF NOT EXISTS idx_bands_link ON bands(link);
+        """)
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def _lookup(self, link, signature):
+        row = self.conn.execute("SELECT canonical FROM signatures WHERE link = ?", (link,)).fetchone()
+        if row:
+            return row[0]
+        where = " OR ".join("(b.band = ? AND b.value = ?)" for _ in range(self.band_count))
+        params = [x for pair in enumerate(bands(signature, self.band_count)) for x in pair]
+        best = None
+        for other_signature, canonical in self.conn.execute(
+                f"SELECT DISTINCT s.signature, s.canonical FROM bands b JOIN signatures s ON s.link = b.link "
+                f"WHERE {where}", params):
+            distance = hamming(signature, _to_unsigned(other_signature))
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, canonical)
+        return best[1] if best else None
+
+    def _add(self, link, signature, canonical):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO signatures (link, signature, canonical, created_at) VALUES (?, ?, ?, ?)",
+            (link, _to_signed(signature), canonical, time.time())
+        )
+        self.conn.execute("DELETE FROM bands WHERE link = ?", (link,))
+        self.conn.executemany(
+            "INSERT INTO bands (band, value, link) VALUES (?, ?, ?)",
+            [(band, value, link) for band, value in enumerate(bands(signature, self.band_count))]
+        )
+
+    def assign(self, articles, text_of):
+        """
+        Sets `duplicate_of` on every article whose text matches an earlier article (in this
+        batch or in the index) and records all signatures. Articles too short to fingerprint
+        are left alone. Returns the number of duplicates found.
+        """
+        duplicates = 0
+        with self._lock:
+            for article in articles:
+                link = article.get('link')
+                text = text_of(article)
+                if not link or len(_WORD.findall(text or "")) < self.min_tokens:
+                    continue
+                signature = simhash(text)
+                canonical = self._lookup(link, signature) or link
+                if canonical != link:
+                    article['duplicate_of'] = canonical
+                    duplicates += 1
+                else:
+                    article.pop('duplicate_of', None)
+                self._add(link, signature, canonical)
+            self.conn.commit()
+        if duplicates:
+            logging.info(f"Found {duplicates} near-duplicate articles.")
+        return duplicates
+
+    def remove(self, links):
+        with self._lock:
+            rows = [(link,) for link in links]
+            self.conn.executemany("DELETE FROM signatures WHERE link = ?", rows)
+            self.conn.executemany("DELETE FROM bands WHERE link = ?", rows)
+            self.conn.commit()
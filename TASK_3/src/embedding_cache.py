@@ -0,0 +1,100 @@
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+
+def text_key(text, model_name):
+    """
+    Cache key for `text` as encoded by `model_name`.
+    """
+    return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache (SQLite) keyed by a hash of the text plus the model name.
+    Vectors are stored as raw float32 bytes. When the cache grows past `max_entries`
+    the least recently used entries are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path, model_name, max_entries=50000):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self.conn.commit()
+
+    def get_many(self, texts):
+        """
+        Returns {position: float32 vector} for every text in `texts` found in the cache.
+        """
+        keys = [text_key(t, self.model_name) for t in texts]
+        found = {}
+        with self._lock:
+            # SQLite limits bound parameters, so look keys up in chunks
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update({key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows})
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+        return {i: found[key] for i, key in enumerate(keys) if key in found}
+
+    def put_many(self, texts, vectors):
+        now = time.time()
+        rows = [
+            (text_key(t, self.model_name), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self.conn.commit()
+            self._evict()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        target = int(self.max_entries * 0.9)
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (count - target,)
+        )
+        self.conn.commit()
+        logging.info(f"Evicted {count - target} entries from embedding cache.")
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
@@ -0,0 +1,66 @@
+
+import struct
+import numpy as np
+from bson.binary import Binary
+
+# Compact on-disk layout for embeddings stored in MongoDB:
+#   1 byte dtype code | (int8 only) 4 byte float32 scale | raw little-endian values
+_FLOAT32 = 1
+_FLOAT16 = 2
+_INT8 = 3
+
+_CODES = {"float32": _FLOAT32, "float16": _FLOAT16, "int8": _INT8}
+
+
+def encode_embedding(vector, dtype="float32"):
+    """
+    Packs an embedding into BSON Binary. float16 halves and int8 quarters the size
+    of float32 (int8 uses a single symmetric scale per vector).
+    """
+    values = np.asarray(vector, dtype=np.float32).ravel()
+    code = _CODES.get(dtype)
+    if code is None:
+        raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+
+    if code == _FLOAT32:
+        payload = values.astype('<f4').tobytes()
+    elif code == _FLOAT16:
+        payload = values.astype('<f2').tobytes()
+    else:
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quantized = np.clip(np.round(values / scale), -127, 127).astype(np.int8)
+        payload = struct.pack('<f', scale) + quantized.tobytes()
+    return Binary(bytes([code]) + payload)
+
+
+def decode_embedding(value):
+    """
+    Returns a float32 array for either the binary format or the legacy list of doubles.
+    float32 payloads are decoded with np.frombuffer and share memory with `value`.
+    Missing or empty embeddings decode to an empty array.
+    """
+    if value is None:
+        return np.zeros(0, dtype=np.float32)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        buffer = memoryview(value)
+        if len(buffer) == 0:
+            return np.zeros(0, dtype=np.float32)
+        code = buffer[0]
+        if code == _FLOAT32:
+            return np.frombuffer(buffer, dtype='<f4', offset=1)
+        if code == _FLOAT16:
+            return np.frombuffer(buffer, dtype='<f2', offset=1).astype(np.float32)
+        if code == _INT8:
+            scale = struct.unpack_from('<f', buffer, 1)[0]
+            return np.frombuffer(buffer, dtype=np.int8, offset=5).astype(np.float32) * scale
+        raise ValueError(f"Unknown embedding encoding: {code}")
+    # Legacy format: BSON array of doubles
+    return np.asarray(value, dtype=np.float32)
+
+
+def has_embedding(value):
+    """
+    True for a non-empty embedding in either format.
+    """
+    return value is not None and len(value) > 0
@@ -1,21 +1,37 @@
 
 import feedparser
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import pandas as pd
 import time
+import json
 import logging
-from datetime import datetime
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 import os
 import sys
 
 # Ensure src is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
-    from config import RSS_FEEDS
+    from config import (RSS_FEEDS, INGEST_CONCURRENT, INGEST_MAX_WORKERS, INGEST_PER_HOST_DELAY,
+                        INGEST_ENTRIES_PER_FEED, FEED_TIMEOUT, ARTICLE_TIMEOUT, FEED_VALIDATORS_PATH,
+                        SKIP_KNOWN_LINKS, ARTICLE_MAX_BYTES, ARTICLE_HTML_PARSER, FEED_VALIDATORS_PENDING_PATH,
+                        ARTICLE_MIN_TEXT_CHARS, ARTICLE_PROFILE_MAX_USES)
+    from date_utils import parse_published, to_iso
+    import instrumentation
 except ImportError:
     # Fallback if running directly
-    from src.config import RSS_FEEDS
+    from src.config import (RSS_FEEDS, INGEST_CONCURRENT, INGEST_MAX_WORKERS, INGEST_PER_HOST_DELAY,
+                            INGEST_ENTRIES_PER_FEED, FEED_TIMEOUT, ARTICLE_TIMEOUT, FEED_VALIDATORS_PATH,
+                            SKIP_KNOWN_LINKS, ARTICLE_MAX_BYTES, ARTICLE_HTML_PARSER, FEED_VALIDATORS_PENDING_PATH,
+                            ARTICLE_MIN_TEXT_CHARS, ARTICLE_PROFILE_MAX_USES)
+    from src.date_utils import parse_published, to_iso
+    from src import instrumentation
 
 # Configure Logging
 logging.basicConfig(
@@ -27,11 +43,208 @@ logging.basicConfig(
     ]
 )
 
+class HostRateLimiter:
+    """
+    Enforces a minimum interval between requests to the same host.
+    Different hosts never wait on each other.
+    """
+    def __init__(self, min_interval=INGEST_PER_HOST_DELAY):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class FeedValidatorCache:
+    """
+    Remembers the ETag and Last-Modified headers of each feed URL (JSON file on disk)
+    so the next poll can send a conditional request and get a cheap 304 back.
+
+    Headers of a fresh response are only staged; they are used once committed, i.e. once
+    the feed's articles are safely stored. Otherwise a failed run would get a 304 next time
+    and never see those entries again.
+    """
+    def __init__(self, path=FEED_VALIDATORS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.validators = {}
+        self.pending = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.validators = json.load(f)
+            except Exception as e:
+                logging.warning(f"Could not read feed validators from {path}: {e}")
+
+    def request_headers(self, url):
+        cached = self.validators.get(url, {})
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def stage(self, url, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            self.pending[url] = {"etag": etag, "last_modified": last_modified} if etag or last_modified else None
+
+    def commit(self, urls=None):
+        """
+        Adopts the staged validators of `urls` (default: every staged feed) and saves the file.
+        """
+        with self._lock:
+            for url in list(self.pending) if urls is None else urls:
+                if url not in self.pending:
+                    continue
+                staged = self.pending.pop(url)
+                if staged:
+                    self.validators[url] = staged
+                else:
+                    self.validators.pop(url, None)
+        self.save()
+
+    def commit_stored(self, articles, written):
+        """
+        Commits the staged feeds whose articles were all written (`written`: the stored links).
+        Link-less entries can never be stored, so they don't hold their feed back.
+        """
+        written = set(written)
+        incomplete = {a.get('source_url') for a in articles if a.get('link') and a['link'] not in written}
+        self.commit([url for url in list(self.pending) if url not in incomplete])
+
+    def save_pending(self, path=FEED_VALIDATORS_PENDING_PATH):
+        """
+        Writes the staged validators to `path`, for a store step that runs in another process.
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.pending, f, indent=4)
+
+    def load_pending(self, path=FEED_VALIDATORS_PENDING_PATH):
+        """
+        Stages the validators written by save_pending() and removes the file, so one ingest
+        run is committed at most once. Returns False if there was nothing to load.
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pending = json.load(f)
+        except Exception as e:
+            logging.warning(f"Could not read staged feed validators from {path}: {e}")
+            return False
+        with self._lock:
+            self.pending.update(pending)
+        os.remove(path)
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.validators, f, indent=4)
+
 class RSSIngester:
-    def __init__(self):
+    def __init__(self, feeds=None, concurrent=INGEST_CONCURRENT, max_workers=INGEST_MAX_WORKERS,
+                 per_host_delay=INGEST_PER_HOST_DELAY, feed_timeout=FEED_TIMEOUT, article_timeout=ARTICLE_TIMEOUT,
+                 entries_per_feed=INGEST_ENTRIES_PER_FEED, store=None, validators_path=FEED_VALIDATORS_PATH,
+                 skip_known_links=SKIP_KNOWN_LINKS):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.feeds = feeds if feeds is not None else RSS_FEEDS
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        self.feed_timeout = feed_timeout
+        self.article_timeout = article_timeout
+        self.entries_per_feed = entries_per_feed
+        self.rate_limiter = HostRateLimiter(per_host_delay)
+        # Shared keep-alive session, pooled to match the worker count
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=max(10, max_workers), pool_maxsize=max(10, max_workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Per-host extraction profile: which tag held the article text last time ("article" or "p"),
+        # with the number of pages it may still be used for before it is re-detected
+        self.site_profiles = {}
+        self.validators = FeedValidatorCache(validators_path)
+        # Optional MongoStore used to skip links that are already stored
+        self.store = store
+        self.skip_known_links = skip_known_links
+        # Per-feed outcome of the last iter_articles run: {url: {"new": n} or {"error": msg}}
+        self.feed_results = {}
+
+    def download_html(self, url):
+        """
+        Streams an article page through the shared session. Returns the body bytes, or None
+        if the status is not 200 or the content is not HTML. Stops at ARTICLE_MAX_BYTES.
+        """
+        self.rate_limiter.wait(url)
+        host = urlparse(url).netloc
+        with instrumentation.timer("article_fetch_seconds", host=host), \
+                self.session.get(url, timeout=self.article_timeout, stream=True) as response:
+            if response.status_code != 200:
+                logging.warning(f"Failed to fetch {url}: Status {response.status_code}")
+                instrumentation.error("article_fetch", host=host)
+                return None
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and 'html' not in content_type:
+                logging.warning(f"Skipping {url}: not HTML ({content_type})")
+                return None
+
+            chunks, size = [], 0
+            for chunk in response.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= ARTICLE_MAX_BYTES:
+                    logging.info(f"Truncated {url} at {ARTICLE_MAX_BYTES} bytes")
+                    break
+            return b''.join(chunks)
+
+    def extract_text(self, html, host=None):
+        """
+        Pulls the article paragraphs out of `html`, building only the tags it needs.
+        Uses the host's cached profile when known; if that yields too little text, or the
+        profile has been used ARTICLE_PROFILE_MAX_USES times, the profile is detected again,
+        so one odd page can't downgrade a host for good.
+        """
+        profile, uses_left = self.site_profiles.get(host, (None, 0))
+        if profile and uses_left > 0:
+            self.site_profiles[host] = (profile, uses_left - 1)
+            soup = BeautifulSoup(html, ARTICLE_HTML_PARSER, parse_only=SoupStrainer(profile))
+            text = ' '.join(p.get_text() for p in soup.find_all('p')).strip()
+            if len(text) >= ARTICLE_MIN_TEXT_CHARS:
+                return text
+
+        # Unknown, stale or unproductive profile: parse <article> and <p> subtrees only
+        soup = BeautifulSoup(html, ARTICLE_HTML_PARSER, parse_only=SoupStrainer(['article', 'p']))
+
+        # Heuristic to find the main article text
+        # 1. Look for <article> tag
+        article = soup.find('article')
+        paragraphs = article.find_all('p') if article else []
+        if paragraphs:
+            self.site_profiles[host] = ("article", ARTICLE_PROFILE_MAX_USES)
+        else:
+            # 2. Fallback to all <p> tags in the body
+            paragraphs = soup.find_all('p')
+            self.site_profiles[host] = ("p", ARTICLE_PROFILE_MAX_USES)
+        return ' '.join(p.get_text() for p in paragraphs).strip()
 
     def fetch_full_text(self, url):
         """
@@ -39,77 +252,237 @@ class RSSIngester:
         This attempts to get the main article content.
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code != 200:
-                logging.warning(f"Failed to fetch {url}: Status {response.status_code}")
+            html = self.download_html(url)
+            if not html:
                 return None
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Heuristic to find the main article text
-            # This is a generic approach; specific sites might need specific selectors
-            # 1. Look for <article> tag
-            article = soup.find('article')
-            if article:
-                paragraphs = article.find_all('p')
-            else:
-                # 2. Fallback to all <p> tags in the body
-                paragraphs = soup.find_all('p')
-            
-            text_content = ' '.join([p.get_text() for p in paragraphs])
-            return text_content.strip()
+            host = urlparse(url).netloc
+            with instrumentation.timer("article_extract_seconds", host=host):
+                return self.extract_text(html, host)
             
         except Exception as e:
             logging.error(f"Error fetching full text for {url}: {e}")
             return None
 
+    def fetch_feed(self, url):
+        """
+        Downloads and parses one RSS feed. Returns the parsed entries (latest first).
+        Sends a conditional request; an unchanged feed (304) returns no entries.
+        """
+        self.rate_limiter.wait(url)
+        headers = self.validators.request_headers(url)
+        host = urlparse(url).netloc
+        with instrumentation.timer("feed_fetch_seconds", host=host):
+            response = self.session.get(url, headers=headers, timeout=self.feed_timeout)
+            if response.status_code == 304:
+                logging.info(f"Feed unchanged since last poll: {url}")
+                return []
+            response.raise_for_status()
+        self.validators.stage(url, response)
+        feed = feedparser.parse(response.content)
+
+        if feed.bozo:
+            logging.warning(f"Bozo exception parsing {url}: {feed.bozo_exception}")
+            # Continue anyway as some content might be parsed
+
+        return feed.entries[:self.entries_per_feed] # Limit to latest N per feed for speed/demo
+
+    def build_article(self, url, category, entry):
+        published_at = parse_published(entry.get('published'), entry.get('published_parsed')) or datetime.now(timezone.utc)
+        return {
+            "source_url": url,
+            "category_group": category,
+            "title": entry.get('title', 'No Title'),
+            "link": entry.get('link', ''),
+            "published": entry.get('published', datetime.now().isoformat()),
+            "published_at": to_iso(published_at),  # normalized UTC, stored as a datetime
+            "summary_rss": entry.get('summary', ''),
+            "full_text": None,
+            "ingested_at": datetime.now().isoformat()
+        }
+
+    def attach_full_text(self, article):
+        # Fetch full text
+        if article['link']:
+            logging.info(f"Fetching full text for: {article['title'][:30]}...")
+            full_text = self.fetch_full_text(article['link'])
+            if full_text:
+                article['full_text'] = full_text
+            else:
+                article['full_text'] = article['summary_rss'] # Fallback
+        return article
+
+    def drop_known(self, articles):
+        """
+        Removes articles whose link is already stored, using one bulk lookup.
+        """
+        if not (self.skip_known_links and self.store is not None and articles):
+            return articles
+        try:
+            known = self.store.get_known_links([a['link'] for a in articles if a['link']])
+        except Exception as e:
+            logging.warning(f"Known-link lookup failed, fetching all entries: {e}")
+            return articles
+        if known:
+            logging.info(f"Skipping {len(known)} already stored articles.")
+        return [a for a in articles if a['link'] not in known]
+
+    def _feed_list(self, feeds=None):
+        feeds = feeds if feeds is not None else self.feeds
+        return [(category, url) for category, urls in feeds.items() for url in urls]
+
     def ingest_feeds(self):
         """
         Iterates through all configured feeds and fetches articles.
-        Returns a list of dictionaries.
+        Returns a list of dictionaries, in feed order then entry order.
+        Feed validators are left staged: commit them (commit_validators() or
+        validators.commit_stored()) only once the articles are stored.
         """
+        if self.concurrent:
+            return self._ingest_concurrent()
+
         all_articles = []
         
-        for category, urls in RSS_FEEDS.items():
+        for category, urls in self.feeds.items():
             logging.info(f"Processing category: {category}")
             for url in urls:
                 logging.info(f"Fetching RSS: {url}")
                 try:
-                    feed = feedparser.parse(url)
-                    
-                    if feed.bozo:
-                        logging.warning(f"Bozo exception parsing {url}: {feed.bozo_exception}")
-                        # Continue anyway as some content might be parsed
-                        
-                    for entry in feed.entries[:5]: # Limit to latest 5 per feed for speed/demo
-                        article = {
-                            "source_url": url,
-                            "category_group": category,
-                            "title": entry.get('title', 'No Title'),
-                            "link": entry.get('link', ''),
-                            "published": entry.get('published', datetime.now().isoformat()),
-                            "summary_rss": entry.get('summary', ''),
-                            "full_text": None,
-                            "ingested_at": datetime.now().isoformat()
-                        }
-                        
-                        # Fetch full text
-                        if article['link']:
-                            logging.info(f"Fetching full text for: {article['title'][:30]}...")
-                            full_text = self.fetch_full_text(article['link'])
-                            if full_text:
-                                article['full_text'] = full_text
-                            else:
-                                article['full_text'] = article['summary_rss'] # Fallback
-                        
-                        all_articles.append(article)
-                        time.sleep(1) # Polite delay
+                    articles = [self.build_article(url, category, entry) for entry in self.fetch_feed(url)]
+                    for article in self.drop_known(articles):
+                        all_articles.append(self.attach_full_text(article))
                         
                 except Exception as e:
                     logging.error(f"Error processing feed {url}: {e}")
-                    
+
         return all_articles
 
+    def _ingest_concurrent(self):
+        """
+        Same result as the serial path, but feeds and article pages are fetched on a bounded
+        thread pool. Politeness comes from the per-host rate limiter, not a global sleep.
+        """
+        feed_list = self._feed_list()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # 1. Fetch every feed
+            feed_futures = [(category, url, pool.submit(self.fetch_feed, url)) for category, url in feed_list]
+            articles = []
+            for category, url, future in feed_futures:
+                try:
+                    for entry in future.result():
+                        articles.append(self.build_article(url, category, entry))
+                except Exception as e:
+                    logging.error(f"Error processing feed {url}: {e}")
+            articles = self.drop_known(articles)
+
+            # 2. Fetch article pages, interleaving hosts so workers don't all queue on one site
+            by_host = defaultdict(deque)
+            for article in articles:
+                by_host[urlparse(article['link']).netloc].append(article)
+            interleaved = []
+            while by_host:
+                for host in list(by_host):
+                    interleaved.append(by_host[host].popleft())
+                    if not by_host[host]:
+                        del by_host[host]
+
+            futures = [pool.submit(self.attach_full_text, article) for article in interleaved]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Error fetching article: {e}")
+
+        # Articles were filled in place, so `articles` keeps feed/entry order
+        return articles
+
+    def _new_articles(self, url, category, entries):
+        articles = self.drop_known([self.build_article(url, category, entry) for entry in entries])
+        self.feed_results[url] = {"new": len(articles)}
+        return articles
+
+    def iter_articles(self, feeds=None):
+        """
+        Streaming variant of ingest_feeds: yields each article as soon as its full text is in.
+        `feeds` ({category: [urls]}) polls just those feeds instead of the configured ones.
+        In concurrent mode articles are yielded in completion order, not feed order.
+        Feed validators are left staged: the consumer calls commit_validators() for the feeds
+        whose articles it has stored.
+        """
+        self.feed_results = {}
+        if not self.concurrent:
+            for category, url in self._feed_list(feeds):
+                logging.info(f"Fetching RSS: {url}")
+                try:
+                    articles = self._new_articles(url, category, self.fetch_feed(url))
+                except Exception as e:
+                    logging.error(f"Error processing feed {url}: {e}")
+                    self.feed_results[url] = {"error": str(e)}
+                    continue
+                for article in articles:
+                    yield self.attach_full_text(article)
+            return
+
+        # Article pages wait in per-host queues and each host gets at most `per_host` downloads in
+        # flight (one fetching, one waiting for its rate-limit slot), so workers never pile up
+        # sleeping on one site while other hosts' pages sit in the pool queue
+        per_host = 2 if self.rate_limiter.min_interval > 0 else self.max_workers
+        waiting = defaultdict(deque)
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            def dispatch():
+                submitted = set()
+                busy = Counter(in_flight.values())
+                for host in list(waiting):
+                    while waiting[host] and busy[host] < per_host:
+                        future = pool.submit(self.attach_full_text, waiting[host].popleft())
+                        in_flight[future] = host
+                        busy[host] += 1
+                        submitted.add(future)
+                    if not waiting[host]:
+                        del waiting[host]
+                return submitted
+
+            feed_futures = {pool.submit(self.fetch_feed, url): (category, url) for category, url in self._feed_list(feeds)}
+            pending = set(feed_futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                ready = []
+                for future in done:
+                    if future in feed_futures:
+                        category, url = feed_futures[future]
+                        try:
+                            articles = self._new_articles(url, category, future.result())
+                        except Exception as e:
+                            logging.error(f"Error processing feed {url}: {e}")
+                            self.feed_results[url] = {"error": str(e)}
+                            continue
+                        for article in articles:
+                            waiting[urlparse(article['link']).netloc].append(article)
+                    else:
+                        del in_flight[future]
+                        ready.append(future)
+                # Refill the pool before handing articles downstream
+                pending |= dispatch()
+                for future in ready:
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        logging.error(f"Error fetching article: {e}")
+
+    def commit_validators(self, urls):
+        """
+        Makes the last poll's ETag / Last-Modified of `urls` count for the next conditional request.
+        """
+        self.validators.commit(urls)
+
+    def close(self):
+        """
+        Closes the pooled keep-alive connections.
+        """
+        self.session.close()
+
     def save_raw_data(self, articles, output_file="data/raw/latest_articles.json"):
         import json
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -122,4 +495,7 @@ if __name__ == "__main__":
     ingester = RSSIngester()
     articles = ingester.ingest_feeds()
     ingester.save_raw_data(articles)
+    # Committed by `python src/store_mongo.py` once the processed articles are stored
+    ingester.validators.save_pending()
     print(f"Ingestion Complete. Fetched {len(articles)} articles.")
+    instrumentation.export_snapshot()
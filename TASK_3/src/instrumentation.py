@@ -0,0 +1,254 @@
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Ensure src is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    from config import METRICS_SNAPSHOT_PATH, METRICS_PROMETHEUS_PATH
+except ImportError:
+    from src.config import METRICS_SNAPSHOT_PATH, METRICS_PROMETHEUS_PATH
+
+# Upper bounds in seconds; covers sub-millisecond index lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Help text for the metric families recorded across the pipeline
+METRIC_HELP = {
+    "feed_fetch_seconds": "RSS feed request latency per host",
+    "article_fetch_seconds": "Article page download latency per host",
+    "article_extract_seconds": "Full-text extraction (HTML parsing) time per host",
+    "llm_request_seconds": "Chat completion latency, including retries",
+    "llm_retries_total": "Retried chat completions by HTTP status",
+    "llm_batch_items_failed_total": "Articles missing or malformed in a batched reply",
+    "embedding_batch_seconds": "Embedding encode latency per batch",
+    "embedding_cache_hits_total": "Texts served from the embedding cache",
+    "embedding_texts_total": "Texts passed to get_embeddings",
+    "mongo_write_seconds": "MongoDB bulk write latency per batch",
+    "retrieval_seconds": "RAG retrieval latency per query",
+    "pipeline_stage_seconds": "Busy time per streaming pipeline micro-batch",
+    "errors_total": "Errors by stage",
+}
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds (Prometheus style).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimated quantile, interpolated linearly inside the bucket that contains it.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "max": round(self.max, 6),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), _cumulative(self.counts))}
+        }
+
+
+def _round(value):
+    return round(value, 6) if value is not None else None
+
+
+def _cumulative(counts):
+    total, result = 0, []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of latency histograms and counters, keyed by metric name and labels.
+    Thread-safe; export with to_prometheus() or snapshot().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}   # name -> {label key: Histogram}
+        self._counters = {}     # name -> {label key: value}
+        self.started_at = time.time()
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def error(self, stage, amount=1, **labels):
+        self.increment("errors_total", amount, stage=stage, **labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Times the block into histogram `name`; an exception also counts as an error for that
+        stage (the name without its `_seconds` suffix).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(name[:-len("_seconds")] if name.endswith("_seconds") else name, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    # --- Export ---
+
+    def snapshot(self):
+        """
+        JSON-friendly view: {"histograms": [...], "counters": [...]} with one entry per label set.
+        """
+        with self._lock:
+            histograms = [
+                {"name": name, "labels": dict(key), **histogram.as_dict()}
+                for name, series in sorted(self._histograms.items())
+                for key, histogram in sorted(series.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(key), "value": value}
+                for name, series in sorted(self._counters.items())
+                for key, value in sorted(series.items())
+            ]
+        return {"generated_at": time.time(), "started_at": self.started_at,
+                "histograms": histograms, "counters": counters}
+
+    def to_prometheus(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets + ("+Inf",), _cumulative(histogram.counts)):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', bound))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path, fmt="json"):
+        """
+        Writes the current metrics to `path` as JSON or Prometheus text ("prometheus").
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if fmt == "prometheus":
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp_path, path)
+
+
+def _shared_registry():
+    # The sys.path fallbacks let this module load as both `instrumentation` and
+    # `src.instrumentation`; both must record into the same registry
+    for name in ("instrumentation", "src.instrumentation"):
+        module = sys.modules.get(name)
+        if module is not None and hasattr(module, "REGISTRY"):
+            return module.REGISTRY
+    return MetricsRegistry()
+
+
+# Shared registry used by all modules
+REGISTRY = _shared_registry()
+timer = REGISTRY.timer
+observe = REGISTRY.observe
+increment = REGISTRY.increment
+error = REGISTRY.error
+
+
+def export_snapshot(json_path=METRICS_SNAPSHOT_PATH, prometheus_path=METRICS_PROMETHEUS_PATH):
+    """
+    Writes the shared registry as JSON and Prometheus text for external scrapers. Called at the
+    end of every pipeline run and CLI job; a failed write is logged, never raised.
+    """
+    try:
+        if json_path:
+            REGISTRY.write_snapshot(json_path)
+        if prometheus_path:
+            REGISTRY.write_snapshot(prometheus_path, fmt="prometheus")
+    except Exception as e:
+        logging.warning(f"Could not write metrics snapshot: {e}")
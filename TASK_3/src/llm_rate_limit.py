@@ -0,0 +1,134 @@
+
+import logging
+import random
+import threading
+import time
+
+try:
+    import instrumentation
+except ImportError:
+    from src import instrumentation
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+
+def error_status(error):
+    """
+    HTTP status of an API error (groq/openai style exceptions expose `status_code`).
+    """
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status
+
+
+def retry_after_seconds(error):
+    """
+    Parses a Retry-After header (seconds) from an API error, if present.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    """
+    429s, 5xx and connection/timeout errors (no status at all) are worth retrying.
+    """
+    status = error_status(error)
+    if status is None:
+        return 'Connection' in type(error).__name__ or 'Timeout' in type(error).__name__
+    return status == 429 or status >= 500
+
+
+class AdaptiveLimiter:
+    """
+    Bounds the number of in-flight LLM requests and adapts to the provider's limits.
+
+    The allowed concurrency grows by one after `increase_after` consecutive successes
+    (up to `max_concurrency`) and halves on every 429. A Retry-After hint pauses all
+    new requests until it has passed.
+    """
+
+    def __init__(self, max_concurrency=4, min_concurrency=1, increase_after=10):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.increase_after = increase_after
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                    continue
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self._cond.wait()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_rate_limited(self, retry_after=None):
+        with self._cond:
+            self._successes = 0
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logging.warning(f"LLM rate limited; concurrency now {self.limit}" +
+                            (f", pausing {retry_after:.1f}s" if retry_after else ""))
+
+
+def call_with_backoff(fn, limiter=None, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """
+    Calls `fn()` holding a limiter slot, retrying retryable errors with full-jitter
+    exponential backoff (never shorter than the server's Retry-After).
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if limiter is not None:
+                limiter.release()
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            retry_after = retry_after_seconds(e)
+            if error_status(e) == 429 and limiter is not None:
+                limiter.on_rate_limited(retry_after)
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            attempt += 1
+            instrumentation.increment("llm_retries_total", status=error_status(e) or "none")
+            logging.warning(f"LLM call failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        if limiter is not None:
+            limiter.release()
+            limiter.on_success()
+        return result
@@ -0,0 +1,247 @@
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from config import EMBEDDING_MODEL, EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_THREADS, EMBEDDING_PARITY_MIN_COSINE
+except ImportError:
+    from src.config import EMBEDDING_MODEL, EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_THREADS, EMBEDDING_PARITY_MIN_COSINE
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+# Model file per backend inside EMBEDDING_ONNX_DIR
+MODEL_FILES = {"onnx": "model.onnx", "onnx-int8": "model_int8.onnx"}
+TOKENIZER_FILE = "tokenizer.json"
+ENCODER_CONFIG_FILE = "encoder_config.json"
+
+# Default parity sample: short queries and article-length text, like real traffic
+PARITY_TEXTS = [
+    "latest news on inflation",
+    "what happened at the climate summit",
+    "Central bank raises interest rates for the third time this year as inflation stays above target.",
+    "The championship final went to penalties after a goalless draw, with the home side winning 4-3.",
+    "Researchers published a genome study linking two rare variants to a higher risk of heart disease.",
+    "A new smartphone chip promises longer battery life and faster on-device AI features.",
+    "Parliament passed the border treaty after a long debate, with several ministers abstaining.",
+    "The film premiere drew thousands of fans to the festival despite heavy rain. " * 8,
+]
+
+
+class OnnxEncoder:
+    """
+    Runs an exported sentence-transformers model (transformer + mean pooling + optional
+    normalization) on ONNX Runtime. Exposes the parts of the SentenceTransformer API the
+    project uses, so it can stand in for it in utils_embeddings. Imports neither torch
+    nor sentence_transformers.
+    """
+
+    def __init__(self, model_dir=EMBEDDING_ONNX_DIR, backend="onnx", threads=EMBEDDING_ONNX_THREADS):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        if backend not in MODEL_FILES:
+            raise ValueError(f"Unknown ONNX backend '{backend}', expected one of {sorted(MODEL_FILES)}")
+        model_path = os.path.join(model_dir, MODEL_FILES[backend])
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; run `python src/onnx_embedder.py export` first")
+
+        with open(os.path.join(model_dir, ENCODER_CONFIG_FILE), 'r', encoding='utf-8') as f:
+            self.encoder_config = json.load(f)
+        self.backend = backend
+        self.normalize = self.encoder_config["normalize"]
+        self.dimension = self.encoder_config["dimension"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.encoder_config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.encoder_config["pad_token_id"], pad_token=self.encoder_config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        """
+        Same contract as SentenceTransformer.encode: one vector for a string, a
+        (len(sentences), dim) float32 array for a list.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        # Longest first, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            vectors[rows] = self._encode_batch([texts[i] for i in rows])
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+
+def export_model(model_name=EMBEDDING_MODEL, output_dir=EMBEDDING_ONNX_DIR, quantize=True, opset=14):
+    """
+    One-off export of the SentenceTransformer's transformer to ONNX (plus a dynamically
+    int8-quantized copy) with its tokenizer and pooling settings. Needs torch and
+    sentence_transformers, which the ONNX backend itself does not, and the `onnx` package
+    (used by torch.onnx.export and by the int8 quantizer).
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    try:
+        import onnx  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Exporting needs the `onnx` package: pip install onnx==1.15.0") from e
+
+    model = SentenceTransformer(model_name, device="cpu")
+    module_names = [type(module).__name__ for module in model]
+    pooling = model[1] if len(model) > 1 else None
+    if type(pooling).__name__ != "Pooling" or pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"{model_name} does not use mean pooling ({module_names}); only mean pooling is supported")
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = model.tokenizer
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+
+    class TokenEmbeddings(torch.nn.Module):
+        # The traced graph returns last_hidden_state only; pooling runs in NumPy
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(input_ids=input_ids, attention_mask=attention_mask,
+                                    token_type_ids=token_type_ids)[0]
+
+    sample = tokenizer(["an example sentence to trace", "another"], padding=True, return_tensors="pt")
+    model_path = os.path.join(output_dir, MODEL_FILES["onnx"])
+    dynamic = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(model[0].auto_model.eval()),
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            model_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["token_embeddings"],
+            dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "token_type_ids": dynamic,
+                          "token_embeddings": dynamic},
+            opset_version=opset
+        )
+    logging.info(f"Exported {model_name} to {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = os.path.join(output_dir, MODEL_FILES["onnx-int8"])
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        logging.info(f"Quantized weights to int8 at {quantized_path}")
+
+    encoder_config = {
+        "model": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "normalize": "Normalize" in module_names,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id
+    }
+    with open(os.path.join(output_dir, ENCODER_CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(encoder_config, f, indent=4)
+    return encoder_config
+
+
+def parity_check(backend="onnx-int8", model_dir=EMBEDDING_ONNX_DIR, texts=None, min_cosine=EMBEDDING_PARITY_MIN_COSINE):
+    """
+    Encodes the same texts with the PyTorch SentenceTransformer and the ONNX backend and
+    compares them row by row. Also reports load time and single-query encode latency of both.
+    """
+    texts = list(texts or PARITY_TEXTS)
+
+    def load_and_time(load):
+        start = time.perf_counter()
+        model = load()
+        load_s = time.perf_counter() - start
+        vectors = np.asarray(model.encode(texts, convert_to_numpy=True, show_progress_bar=False), dtype=np.float32)
+        start = time.perf_counter()
+        for text in texts:
+            model.encode(text)
+        return vectors, load_s, (time.perf_counter() - start) / len(texts)
+
+    def load_torch():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+    onnx_vectors, onnx_load_s, onnx_query_s = load_and_time(lambda: OnnxEncoder(model_dir, backend))
+    torch_vectors, torch_load_s, torch_query_s = load_and_time(load_torch)
+
+    norms = np.linalg.norm(onnx_vectors, axis=1) * np.linalg.norm(torch_vectors, axis=1)
+    cosines = (onnx_vectors * torch_vectors).sum(axis=1) / np.clip(norms, 1e-12, None)
+    report = {
+        "backend": backend,
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "max_abs_diff": round(float(np.abs(onnx_vectors - torch_vectors).max()), 6),
+        "threshold": min_cosine,
+        "passed": bool(cosines.min() >= min_cosine),
+        "torch_load_s": round(torch_load_s, 3),
+        "onnx_load_s": round(onnx_load_s, 3),
+        "torch_query_ms": round(torch_query_s * 1000, 3),
+        "onnx_query_ms": round(onnx_query_s * 1000, 3)
+    }
+    log = logging.info if report["passed"] else logging.error
+    log(f"Parity {backend}: min cosine {report['min_cosine']} (threshold {min_cosine}), "
+        f"max abs diff {report['max_abs_diff']}, query {report['torch_query_ms']} ms -> {report['onnx_query_ms']} ms")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX and check parity with PyTorch.")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--model-dir", default=EMBEDDING_ONNX_DIR)
+    parser.add_argument("--backend", choices=sorted(MODEL_FILES), nargs="+", default=sorted(MODEL_FILES),
+                        help="Backends to check for parity")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 copy on export")
+    parser.add_argument("--texts-file", default=None, help="Parity sample, one text per line")
+    parser.add_argument("--min-cosine", type=float, default=EMBEDDING_PARITY_MIN_COSINE)
+    args = parser.parse_args()
+
+    backends = args.backend
+    if args.command == "export":
+        export_model(output_dir=args.model_dir, quantize=not args.no_quantize)
+        if args.no_quantize:
+            backends = [b for b in backends if b != "onnx-int8"]
+
+    texts = None
+    if args.texts_file:
+        with open(args.texts_file, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    # Parity runs after every export, so a bad export never goes unnoticed
+    reports = [parity_check(backend, args.model_dir, texts, args.min_cosine) for backend in backends]
+    print(json.dumps(reports, indent=4))
+    sys.exit(0 if all(r["passed"] for r in reports) else 1)
@@ -0,0 +1,283 @@
+
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+
+# Ensure src is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    from config import PIPELINE_QUEUE_SIZE, PIPELINE_BATCH_SIZE, PIPELINE_BATCH_WAIT, INCREMENTAL_PROCESSING
+    from ingest_rss import RSSIngester
+    from process_llm import ArticleProcessor, embed_articles
+    from store_mongo import MongoStore
+    import instrumentation
+except ImportError:
+    from src.config import PIPELINE_QUEUE_SIZE, PIPELINE_BATCH_SIZE, PIPELINE_BATCH_WAIT, INCREMENTAL_PROCESSING
+    from src.ingest_rss import RSSIngester
+    from src.process_llm import ArticleProcessor, embed_articles
+    from src.store_mongo import MongoStore
+    from src import instrumentation
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class StageStats:
+    """
+    Throughput counters for one pipeline stage.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.first_output_at = None
+        self.finished_at = None
+
+    def record(self, count, busy):
+        now = time.time()
+        self.items += count
+        self.busy_seconds += busy
+        instrumentation.observe("pipeline_stage_seconds", busy, stage=self.name)
+        if self.first_output_at is None and count:
+            self.first_output_at = now
+
+    def as_dict(self, pipeline_start):
+        elapsed = (self.finished_at or time.time()) - (self.started_at or pipeline_start)
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "elapsed_s": round(elapsed, 3),
+            "busy_s": round(self.busy_seconds, 3),
+            "items_per_s": round(self.items / elapsed, 3) if elapsed > 0 else 0.0,
+            "first_output_s": round(self.first_output_at - pipeline_start, 3) if self.first_output_at else None
+        }
+
+
+def _take_batch(source, max_items, max_wait):
+    """
+    Blocks for one item, then gathers up to `max_items` more for at most `max_wait` seconds.
+    Returns (items, done) where done means the upstream stage has finished.
+    """
+    first = source.get()
+    if first is _DONE:
+        return [], True
+    items = [first]
+    deadline = time.monotonic() + max_wait
+    while len(items) < max_items:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = source.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if item is _DONE:
+            return items, True
+        items.append(item)
+    return items, False
+
+
+def _drain(source):
+    """
+    Discards items until the upstream stage finishes, so a failed stage never blocks it.
+    """
+    while source.get() is not _DONE:
+        pass
+
+
+class StreamingPipeline:
+    """
+    Fetch -> enrich -> embed -> store, each stage on its own thread, connected by bounded
+    queues. The first article is stored while later ones are still being fetched, and no
+    stage holds more than a queue's worth of articles.
+
+    The raw/processed JSON files are written only when checkpoint paths are given.
+    `feeds` ({category: [urls]}) limits the run to those feeds (default: the ingester's own).
+    """
+
+    def __init__(self, store=None, ingester=None, processor=None, queue_size=PIPELINE_QUEUE_SIZE,
+                 batch_size=PIPELINE_BATCH_SIZE, batch_wait=PIPELINE_BATCH_WAIT,
+                 incremental=INCREMENTAL_PROCESSING, raw_checkpoint=None, processed_checkpoint=None, feeds=None):
+        self.store = store if store is not None else MongoStore()
+        self.ingester = ingester if ingester is not None else RSSIngester(store=self.store)
+        self.processor = processor if processor is not None else ArticleProcessor()
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.incremental = incremental
+        self.raw_checkpoint = raw_checkpoint
+        self.processed_checkpoint = processed_checkpoint
+        self.feeds = feeds
+        self.stats = {name: StageStats(name) for name in ("fetch", "enrich", "embed", "store")}
+        self.store_totals = {"inserted": 0, "updated": 0, "failed": 0, "batches": 0}
+        # Articles stored per feed URL, to tell which feeds were handled completely
+        self.stored_by_feed = Counter()
+        self.started_at = None
+
+    # --- Stages ---
+
+    def _fetch(self, out):
+        stats = self.stats["fetch"]
+        raw = [] if self.raw_checkpoint else None
+        try:
+            tick = time.perf_counter()
+            for article in self.ingester.iter_articles(feeds=self.feeds):
+                stats.record(1, time.perf_counter() - tick)
+                if raw is not None:
+                    raw.append(dict(article))
+                out.put(article)
+                tick = time.perf_counter()
+        except Exception as e:
+            logging.error(f"Fetch stage error: {e}")
+        finally:
+            out.put(_DONE)
+            stats.finished_at = time.time()
+        if raw is not None:
+            self.ingester.save_raw_data(raw, self.raw_checkpoint)
+
+    def _enrich(self, source, out):
+        stats = self.stats["enrich"]
+        done = False
+        try:
+            while not done:
+                batch, done = _take_batch(source, self.batch_size, self.batch_wait)
+                if not batch:
+                    continue
+                tick = time.perf_counter()
+                pending = batch
+                if self.incremental:
+                    pending = self.processor.reuse_stored_enrichment(batch, self.store)
+                self.processor.enrich_unique(pending, self.store)
+                stats.record(len(batch), time.perf_counter() - tick)
+                for article in batch:
+                    out.put(article)
+        except Exception as e:
+            logging.error(f"Enrich stage error: {e}")
+            if not done:
+                _drain(source)
+        finally:
+            out.put(_DONE)
+            stats.finished_at = time.time()
+
+    def _embed(self, source, out):
+        stats = self.stats["embed"]
+        done = False
+        try:
+            while not done:
+                batch, done = _take_batch(source, self.batch_size, self.batch_wait)
+                if not batch:
+                    continue
+                tick = time.perf_counter()
+                # Articles that reused a stored enrichment already carry their embedding,
+                # and near-duplicates are never retrieved so they need none
+                embed_articles([a for a in batch if not a.get('embedding') and not a.get('duplicate_of')])
+                stats.record(len(batch), time.perf_counter() - tick)
+                for article in batch:
+                    out.put(article)
+        except Exception as e:
+            logging.error(f"Embed stage error: {e}")
+            if not done:
+                _drain(source)
+        finally:
+            out.put(_DONE)
+            stats.finished_at = time.time()
+
+    def _store(self, source):
+        stats = self.stats["store"]
+        processed = [] if self.processed_checkpoint else None
+        done = False
+        try:
+            while not done:
+                batch, done = _take_batch(source, self.batch_size, self.batch_wait)
+                if not batch:
+                    continue
+                tick = time.perf_counter()
+                totals = self.store.store_articles(batch, batch_size=len(batch))
+                stats.record(len(batch), time.perf_counter() - tick)
+                for key in self.store_totals:
+                    self.store_totals[key] += totals[key]
+                # A feed is credited per stored article; link-less entries can never be stored,
+                # so they count as handled rather than holding the feed's validators back
+                written = set(totals['written'])
+                self.stored_by_feed.update(a.get('source_url') for a in batch
+                                           if not a.get('link') or a['link'] in written)
+                if processed is not None:
+                    processed.extend(batch)
+        except Exception as e:
+            logging.error(f"Store stage error: {e}")
+            if not done:
+                _drain(source)
+        finally:
+            stats.finished_at = time.time()
+        if processed is not None:
+            os.makedirs(os.path.dirname(self.processed_checkpoint) or '.', exist_ok=True)
+            with open(self.processed_checkpoint, 'w', encoding='utf-8') as f:
+                json.dump(processed, f, indent=4)
+
+    # --- Driver ---
+
+    def run(self):
+        """
+        Runs all stages to completion and returns the per-stage report.
+        """
+        self.started_at = time.time()
+        for stats in self.stats.values():
+            stats.started_at = self.started_at
+
+        fetched = queue.Queue(maxsize=self.queue_size)
+        enriched = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._fetch, args=(fetched,), name="pipeline-fetch"),
+            threading.Thread(target=self._enrich, args=(fetched, enriched), name="pipeline-enrich"),
+            threading.Thread(target=self._embed, args=(enriched, embedded), name="pipeline-embed"),
+            threading.Thread(target=self._store, args=(embedded,), name="pipeline-store"),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.commit_validators()
+
+        report = self.report()
+        logging.info(f"Pipeline complete: {report}")
+        instrumentation.export_snapshot()
+        return report
+
+    def commit_validators(self):
+        """
+        Commits the conditional-request validators of feeds whose new articles were all stored.
+        A feed with a failed article keeps its old validators, so the next poll downloads it
+        again and picks the unstored articles up (stored ones are skipped as known links).
+        """
+        complete = [url for url, result in self.ingester.feed_results.items()
+                    if "error" not in result and self.stored_by_feed[url] >= result.get("new", 0)]
+        try:
+            self.ingester.commit_validators(complete)
+        except Exception as e:
+            logging.warning(f"Could not save feed validators: {e}")
+
+    def report(self):
+        start = self.started_at or time.time()
+        return {
+            "elapsed_s": round(time.time() - start, 3),
+            "stages": [stats.as_dict(start) for stats in self.stats.values()],
+            "stored": dict(self.store_totals)
+        }
+
+
+if __name__ == "__main__":
+    pipeline = StreamingPipeline(
+        raw_checkpoint="data/raw/latest_articles.json",
+        processed_checkpoint="data/processed/processed_articles.json"
+    )
+    print(json.dumps(pipeline.run(), indent=4))
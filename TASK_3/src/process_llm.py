@@ -1,35 +1,174 @@
 
 import json
+import hashlib
 import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import List, Dict
 from groq import Groq
 
 # Ensure src is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
-    from config import CATEGORIES, GROQ_API_KEY, GROQ_MODEL
-    from utils_embeddings import get_embedding
+    from config import (CATEGORIES, GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL, LLM_MAX_CONCURRENCY,
+                        LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, INCREMENTAL_PROCESSING,
+                        DEDUP_ENABLED, DEDUP_INDEX_PATH, DEDUP_MAX_DISTANCE, DEDUP_MIN_TOKENS,
+                        LLM_BATCH_ENABLED, LLM_BATCH_TOKEN_BUDGET, LLM_BATCH_MAX_ARTICLES, LLM_BATCH_ARTICLE_CHARS)
+    from utils_embeddings import get_embeddings
+    from llm_rate_limit import AdaptiveLimiter, call_with_backoff
+    from dedup import NearDuplicateIndex
+    import instrumentation
 except ImportError:
-    from src.config import CATEGORIES, GROQ_API_KEY, GROQ_MODEL
-    from src.utils_embeddings import get_embedding
+    from src.config import (CATEGORIES, GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL, LLM_MAX_CONCURRENCY,
+                            LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, INCREMENTAL_PROCESSING,
+                            DEDUP_ENABLED, DEDUP_INDEX_PATH, DEDUP_MAX_DISTANCE, DEDUP_MIN_TOKENS,
+                            LLM_BATCH_ENABLED, LLM_BATCH_TOKEN_BUDGET, LLM_BATCH_MAX_ARTICLES, LLM_BATCH_ARTICLE_CHARS)
+    from src.utils_embeddings import get_embeddings
+    from src.llm_rate_limit import AdaptiveLimiter, call_with_backoff
+    from src.dedup import NearDuplicateIndex
+    from src import instrumentation
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
+def article_text(article: Dict) -> str:
+    """
+    Text used for both the LLM prompt and the embedding (truncated to 6000 chars).
+    """
+    text = article.get('full_text', '') or article.get('summary_rss', '')
+    return text[:6000]
+
+def content_hash(article: Dict) -> str:
+    """
+    Hash of the inputs that drive enrichment (title + article text).
+    """
+    payload = f"{article.get('title', '')}\0{article_text(article)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+ENRICHMENT_FIELDS = ['llm_summary', 'category', 'sentiment', 'embedding', 'processed_at', 'duplicate_of']
+INHERITED_FIELDS = ['llm_summary', 'category', 'sentiment']
+
+def has_enrichment(doc: Dict) -> bool:
+    """
+    True if a stored document carries a usable LLM enrichment and embedding
+    (near-duplicates are never embedded, so they only need the enrichment).
+    """
+    return bool(doc.get('llm_summary')) and doc.get('llm_summary') != "Processing Failed" \
+        and bool(doc.get('category')) and (bool(doc.get('duplicate_of')) or len(doc.get('embedding') or []) > 0)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token), good enough for budgeting prompts.
+    """
+    return len(text) // 4 + 1
+
+BATCH_PROMPT = """
+        You are a News Intelligence Agent. Analyze each of the following news articles.
+
+        {articles_block}
+
+        Task, for EVERY article above:
+        1. Summarize the article concisely (max 2 sentences).
+        2. Classify it into exactly ONE of these categories: {categories}.
+        3. Determine the sentiment (Positive, Negative, Neutral).
+
+        Output strictly in valid JSON format, with one entry per article id:
+        {{
+            "results": [
+                {{"id": 1, "summary": "...", "category": "...", "sentiment": "..."}}
+            ]
+        }}
+        """
+
+def batch_entry(position: int, article: Dict, article_chars=LLM_BATCH_ARTICLE_CHARS) -> str:
+    """
+    One article as framed inside a batched prompt.
+    """
+    text = article_text(article)[:article_chars]
+    return f'[{position}] Title: {article.get("title", "")}\nText: "{text}"'
+
+def pack_batches(articles: List[Dict], token_budget=LLM_BATCH_TOKEN_BUDGET, max_articles=LLM_BATCH_MAX_ARTICLES,
+                 article_chars=LLM_BATCH_ARTICLE_CHARS) -> List[List[Dict]]:
+    """
+    Groups articles, in order, into batches whose estimated prompt size stays under `token_budget`.
+    The fixed instructions come off the budget first; each article costs its framed entry.
+    """
+    token_budget -= estimate_tokens(BATCH_PROMPT.format(articles_block="", categories=CATEGORIES))
+    batches, current, used = [], [], 0
+    for article in articles:
+        # Framed with the widest id and its separator, so the estimate never runs short
+        cost = estimate_tokens(batch_entry(max_articles, article, article_chars) + "\n\n")
+        if current and (used + cost > token_budget or len(current) >= max_articles):
+            batches.append(current)
+            current, used = [], 0
+        current.append(article)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def apply_enrichment(article: Dict, result: Dict) -> Dict:
+    article['llm_summary'] = result.get('summary', 'Error generating summary')
+    article['category'] = result.get('category', 'Unclassified')
+    article['sentiment'] = result.get('sentiment', 'Neutral')
+    return article
+
+def embed_articles(articles: List[Dict]):
+    """
+    Fills `embedding` for all articles with one batched encode call.
+    """
+    if not articles:
+        return
+    try:
+        vectors = get_embeddings([article_text(a) for a in articles])
+        for article, vector in zip(articles, vectors):
+            article['embedding'] = vector.tolist()
+    except Exception as e:
+        logging.warning(f"Embedding generation failed: {e}")
+        instrumentation.error("embedding")
+        for article in articles:
+            article['embedding'] = []
+
 class ArticleProcessor:
-    def __init__(self):
-        self.client = Groq(api_key=GROQ_API_KEY)
+    def __init__(self, concurrency=LLM_MAX_CONCURRENCY, dedup=DEDUP_ENABLED, batch=LLM_BATCH_ENABLED,
+                 batch_token_budget=LLM_BATCH_TOKEN_BUDGET, batch_max_articles=LLM_BATCH_MAX_ARTICLES):
+        # Retries are handled by call_with_backoff so they can share the adaptive limiter
+        self.client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL, max_retries=0)
         self.model_name = GROQ_MODEL
+        self.concurrency = concurrency
+        self.limiter = AdaptiveLimiter(max_concurrency=max(1, concurrency))
+        self.batch_enabled = batch
+        self.batch_token_budget = batch_token_budget
+        self.batch_max_articles = batch_max_articles
+        self.batch_article_chars = LLM_BATCH_ARTICLE_CHARS
+        # `dedup` is True/False or a ready NearDuplicateIndex
+        if dedup is True:
+            dedup = NearDuplicateIndex(DEDUP_INDEX_PATH, max_distance=DEDUP_MAX_DISTANCE, min_tokens=DEDUP_MIN_TOKENS)
+        elif dedup is False:
+            dedup = None
+        self.dedup = dedup
+
+    def complete(self, messages, purpose="enrich", **kwargs):
+        """
+        One chat completion, bounded by the adaptive limiter and retried with jittered backoff.
+        """
+        with instrumentation.timer("llm_request_seconds", purpose=purpose):
+            return call_with_backoff(
+                lambda: self.client.chat.completions.create(messages=messages, model=self.model_name, **kwargs),
+                limiter=self.limiter,
+                max_retries=LLM_MAX_RETRIES,
+                base_delay=LLM_BACKOFF_BASE,
+                max_delay=LLM_BACKOFF_MAX
+            )
 
-    def process_article(self, article: Dict) -> Dict:
+    def process_article(self, article: Dict, embed=True) -> Dict:
         """
         Sends article text to LLM for Summarization, Classification, and Sentiment.
+        With embed=False the embedding is left to the caller (see embed_articles).
         """
-        text = article.get('full_text', '') or article.get('summary_rss', '')
-        # Truncate text if too long
-        text = text[:6000] 
+        text = article_text(article)
 
         prompt = f"""
         You are a News Intelligence Agent. Analyze the following news article text.
@@ -52,14 +191,13 @@ class ArticleProcessor:
         try:
             logging.info(f"Processing article: {article.get('title')[:30]}...")
             
-            chat_completion = self.client.chat.completions.create(
-                messages=[
+            chat_completion = self.complete(
+                [
                     {
                         "role": "user",
                         "content": prompt,
                     }
                 ],
-                model=self.model_name,
                 response_format={"type": "json_object"},
             )
 
@@ -67,18 +205,14 @@ class ArticleProcessor:
             parsed_result = json.loads(result_json)
             
             # Enrich original article
-            article['llm_summary'] = parsed_result.get('summary', 'Error generating summary')
-            article['category'] = parsed_result.get('category', 'Unclassified')
-            article['sentiment'] = parsed_result.get('sentiment', 'Neutral')
+            apply_enrichment(article, parsed_result)
             
             # Generate Embedding for RAG using local model
-            try:
-                article['embedding'] = get_embedding(text)
-            except Exception as e:
-                logging.warning(f"Embedding generation failed: {e}")
-                article['embedding'] = []
+            if embed:
+                embed_articles([article])
 
-            article['processed_at'] = pd.Timestamp.now().isoformat()
+            article['processed_at'] = datetime.now().isoformat()
+            article['content_hash'] = content_hash(article)
             
             return article
 
@@ -89,9 +223,153 @@ class ArticleProcessor:
             article['sentiment'] = "Neutral"
             return article
 
-    def process_batch(self, input_file="data/raw/latest_articles.json", output_file="data/processed/processed_articles.json"):
-        import pandas as pd 
-        
+    def process_articles(self, articles: List[Dict]) -> List[Dict]:
+        """
+        Sends several articles in one prompt and asks for a JSON array keyed by id.
+        Enriches the articles that came back complete and returns those that did not.
+        """
+        articles_block = "\n\n".join(batch_entry(position, article, self.batch_article_chars)
+                                       for position, article in enumerate(articles, start=1))
+        prompt = BATCH_PROMPT.format(articles_block=articles_block, categories=CATEGORIES)
+
+        try:
+            logging.info(f"Processing batch of {len(articles)} articles...")
+            chat_completion = self.complete(
+                [{"role": "user", "content": prompt}],
+                purpose="enrich_batch",
+                response_format={"type": "json_object"},
+            )
+            parsed = json.loads(chat_completion.choices[0].message.content)
+            results = parsed.get('results', []) if isinstance(parsed, dict) else parsed
+        except Exception as e:
+            logging.error(f"LLM Batch Processing Error: {e}")
+            return list(articles)
+
+        by_id = {}
+        for item in results if isinstance(results, list) else []:
+            if isinstance(item, dict) and str(item.get('id', '')).strip().isdigit():
+                by_id[int(str(item['id']).strip())] = item
+
+        failed = []
+        for position, article in enumerate(articles, start=1):
+            item = by_id.get(position)
+            if not item or not item.get('summary') or not item.get('category'):
+                failed.append(article)
+                continue
+            apply_enrichment(article, item)
+            article['processed_at'] = datetime.now().isoformat()
+            article['content_hash'] = content_hash(article)
+        if failed:
+            instrumentation.increment("llm_batch_items_failed_total", len(failed))
+        return failed
+
+    def _map(self, fn, items):
+        if self.concurrency <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(fn, items))
+
+    def enrich_articles(self, articles: List[Dict]) -> List[Dict]:
+        """
+        Enriches `articles` in place (without embedding), concurrently when self.concurrency > 1.
+        In batch mode articles are packed into multi-article prompts; items missing from a
+        reply are re-requested once in batches of half the size and token budget, then one
+        by one. Keeps the input order.
+        """
+        if not self.batch_enabled or len(articles) <= 1:
+            return self._map(lambda article: self.process_article(article, embed=False), articles)
+
+        pending = articles
+        for attempt in range(2):
+            # The retry round packs at most half as many articles (and tokens) per prompt
+            budget = self.batch_token_budget // (attempt + 1)
+            max_articles = max(1, self.batch_max_articles // (attempt + 1))
+            batches = pack_batches(pending, budget, max_articles, self.batch_article_chars)
+            pending = [article for failed in self._map(self.process_articles, batches) for article in failed]
+            if len(pending) <= 1:
+                break
+        if pending:
+            logging.warning(f"{len(pending)} articles failed in batch mode, retrying individually.")
+            self._map(lambda article: self.process_article(article, embed=False), pending)
+        logging.info(f"Enriched {len(articles)} articles in batch mode.")
+        return articles
+
+    def enrich_unique(self, articles: List[Dict], store=None) -> List[Dict]:
+        """
+        Like enrich_articles, but near-duplicates (same story under another link) are marked
+        with `duplicate_of` and copy the canonical article's enrichment instead of calling
+        the LLM again. The canonical copy may be in this batch or already in `store`.
+        """
+        if self.dedup is None or not articles:
+            return self.enrich_articles(articles)
+
+        self.dedup.assign(articles, article_text)
+        canonical = [a for a in articles if not a.get('duplicate_of')]
+        duplicates = [a for a in articles if a.get('duplicate_of')]
+        self.enrich_articles(canonical)
+        if duplicates:
+            self.inherit_enrichment(duplicates, canonical, store)
+        return articles
+
+    def inherit_enrichment(self, duplicates: List[Dict], batch: List[Dict], store=None):
+        """
+        Copies summary/category/sentiment from each duplicate's canonical article. Duplicates
+        whose canonical is unavailable or failed are unmarked and processed themselves.
+        """
+        sources = {a['link']: a for a in batch if a.get('link')}
+        missing = list({a['duplicate_of'] for a in duplicates} - set(sources))
+        if missing and store is not None:
+            try:
+                sources.update(store.get_enrichment(missing))
+            except Exception as e:
+                logging.warning(f"Canonical lookup failed: {e}")
+
+        orphans = []
+        for article in duplicates:
+            source = sources.get(article['duplicate_of'])
+            if source and source.get('llm_summary') and source.get('llm_summary') != "Processing Failed":
+                for field in INHERITED_FIELDS:
+                    article[field] = source.get(field)
+                article['processed_at'] = datetime.now().isoformat()
+                article['content_hash'] = content_hash(article)
+            else:
+                article.pop('duplicate_of', None)
+                orphans.append(article)
+        self.enrich_articles(orphans)
+        logging.info(f"{len(duplicates) - len(orphans)} duplicates inherited an enrichment, "
+                     f"{len(orphans)} processed on their own.")
+
+    def reuse_stored_enrichment(self, articles: List[Dict], store) -> List[Dict]:
+        """
+        Copies the stored enrichment onto articles whose link is already in MongoDB with the
+        same content hash (one bulk lookup). Returns the articles that still need processing.
+        """
+        try:
+            stored = store.get_enrichment([a['link'] for a in articles if a.get('link')])
+        except Exception as e:
+            logging.warning(f"Incremental lookup failed, processing everything: {e}")
+            return articles
+
+        pending = []
+        for article in articles:
+            doc = stored.get(article.get('link'))
+            digest = content_hash(article)
+            if doc and doc.get('content_hash') == digest and has_enrichment(doc):
+                for field in ENRICHMENT_FIELDS:
+                    if field in doc:
+                        article[field] = doc[field]
+                article['content_hash'] = digest
+            else:
+                pending.append(article)
+        logging.info(f"Incremental mode: {len(articles) - len(pending)} unchanged, {len(pending)} to process.")
+        return pending
+
+    def process_batch(self, input_file="data/raw/latest_articles.json", output_file="data/processed/processed_articles.json",
+                      store=None, incremental=INCREMENTAL_PROCESSING):
+        """
+        Enriches and embeds the raw articles. With a MongoStore and incremental=True, articles
+        already stored with an unchanged content hash keep their enrichment and skip the LLM.
+        """
         if not os.path.exists(input_file):
             logging.error(f"Input file {input_file} not found.")
             return
@@ -99,17 +377,33 @@ class ArticleProcessor:
         with open(input_file, 'r', encoding='utf-8') as f:
             articles = json.load(f)
 
-        processed_articles = []
-        for article in articles:
-            processed = self.process_article(article)
-            processed_articles.append(processed)
+        pending = articles
+        if incremental and store is not None:
+            pending = self.reuse_stored_enrichment(articles, store)
+
+        # Articles are enriched in place, so `articles` keeps the input order
+        self.enrich_unique(pending, store)
+
+        # Embed in batches rather than one encode per article; duplicates stay out of retrieval
+        embed_articles([a for a in pending if not a.get('duplicate_of')])
 
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(processed_articles, f, indent=4)
+            json.dump(articles, f, indent=4)
         
-        logging.info(f"Processed {len(processed_articles)} articles. Saved to {output_file}")
+        logging.info(f"Processed {len(pending)} of {len(articles)} articles. Saved to {output_file}")
 
 if __name__ == "__main__":
+    # Reuse stored enrichment for unchanged articles; without MongoDB everything is processed
+    try:
+        try:
+            from store_mongo import MongoStore
+        except ImportError:
+            from src.store_mongo import MongoStore
+        store = MongoStore()
+    except Exception as e:
+        logging.warning(f"MongoDB unavailable, processing all articles: {e}")
+        store = None
     processor = ArticleProcessor()
-    processor.process_batch()
+    processor.process_batch(store=store)
+    instrumentation.export_snapshot()
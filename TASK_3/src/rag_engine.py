@@ -1,6 +1,8 @@
 
 import numpy as np
 import logging
+import re
+import time
 from typing import List, Dict
 from groq import Groq
 import sys
@@ -9,73 +11,156 @@ import os
 # Ensure src is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
-    from config import GROQ_API_KEY, GROQ_MODEL
+    from config import (GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL, QUERY_EMBEDDING_CACHE_SIZE, ANSWER_CACHE_TTL,
+                        ANSWER_CACHE_SIZE, RETRIEVAL_MODE, BM25_CANDIDATES, RRF_K)
     from utils_embeddings import get_embedding
+    from cache_utils import LRUCache, TTLCache
+    from date_utils import resolve_date_range
+    from bm25_index import reciprocal_rank_fusion
+    import instrumentation
 except ImportError:
-    from src.config import GROQ_API_KEY, GROQ_MODEL
+    from src.config import (GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL, QUERY_EMBEDDING_CACHE_SIZE, ANSWER_CACHE_TTL,
+                            ANSWER_CACHE_SIZE, RETRIEVAL_MODE, BM25_CANDIDATES, RRF_K)
     from src.utils_embeddings import get_embedding
+    from src.cache_utils import LRUCache, TTLCache
+    from src.date_utils import resolve_date_range
+    from src.bm25_index import reciprocal_rank_fusion
+    from src import instrumentation
 
 # Basic cosine similarity
 def cosine_similarity(a, b):
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
+def normalize_query(query: str) -> str:
+    """
+    Cache key form of a question: lowercased, whitespace collapsed, trailing punctuation dropped.
+    """
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+def range_key(date_range, step=ANSWER_CACHE_TTL):
+    """
+    Answer-cache form of a resolved (start, end, label) range: both bounds floored to `step`
+    seconds, so a sliding window ("last 24h") keeps one key for a cache lifetime while
+    calendar bounds (midnight) stay exact.
+    """
+    if not date_range:
+        return None
+    step = max(1, int(step))
+    return tuple(int(bound.timestamp()) // step * step if bound else None for bound in date_range[:2])
+
 class RAGEngine:
     def __init__(self, mongo_store):
         self.store = mongo_store
-        self.client = Groq(api_key=GROQ_API_KEY)
+        self.client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
         self.model_name = GROQ_MODEL
+        # Level 1: query embeddings; level 2: full answers, scoped to the corpus version
+        self.query_embeddings = LRUCache(max_entries=QUERY_EMBEDDING_CACHE_SIZE)
+        self.answers = TTLCache(ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE)
 
-    def retrieve(self, query: str, top_k=5, date_filter=None):
+    def embed_query(self, query: str):
+        key = normalize_query(query)
+        embedding = self.query_embeddings.get(key)
+        if embedding is None:
+            embedding = get_embedding(key)
+            self.query_embeddings.set(key, embedding)
+        return embedding
+
+    def retrieve(self, query: str, top_k=5, date_range=None, mode=RETRIEVAL_MODE):
         """
-        Retrieves relevant articles based on vector similarity.
-        Optionally filters by date (string match on Published field).
+        Retrieves relevant articles using the store's resident indexes.
+        mode="dense" ranks by vector similarity, mode="lexical" by BM25, and mode="hybrid" takes
+        the BM25 top candidates, scores them densely and fuses both rankings (RRF).
+        Optionally restricted to articles published in date_range = (start, end) UTC datetimes;
+        a range reaching back past the retention window also searches the archive.
         """
+        start = time.perf_counter()
+        self.store.sync()
         try:
-            # 1. Get Query Embedding locally
-            query_embedding = get_embedding(query)
-            
-            if not query_embedding:
+            # 1. Pick the tiers to search: (vector index, lexical index getters, allowed links)
+            tiers = []
+            if date_range:
+                # Indexed range scan on the normalized published_at datetime
+                allowed_links = self.store.get_links_in_range(date_range[0], date_range[1])
+                if allowed_links:
+                    tiers.append((self.store.get_vector_index, self.store.get_lexical_index, allowed_links))
+                if self.store.archive_reaches(date_range[0]):
+                    archive_vector, archive_lexical = self.store.get_archive_indexes(date_range[0], date_range[1])
+                    if len(archive_lexical):
+                        tiers.append((lambda: archive_vector, lambda: archive_lexical, None))
+            else:
+                tiers.append((self.store.get_vector_index, self.store.get_lexical_index, None))
+
+            # 2. Rank each tier; hot and archive rankings are fused like lexical and dense ones
+            rankings = [ranking for ranking in (self._rank(query, top_k, mode, *tier) for tier in tiers) if ranking]
+            if not rankings:
                 return []
+            if len(rankings) == 1:
+                links = rankings[0]
+            else:
+                links = [link for link, _ in reciprocal_rank_fusion(rankings, k=RRF_K)[:top_k]]
 
-            # 2. Build Query Filter
-            mongo_query = {"embedding": {"$exists": True, "$ne": []}}
-            if date_filter:
-                # Simple string match for date in published field (YYYY-MM-DD or similar)
-                mongo_query["published"] = {"$regex": date_filter, "$options": "i"}
-
-            # 3. Fetch all candidates matching filter
-            candidates = list(self.store.collection.find(mongo_query))
-            
-            scored_candidates = []
-            for doc in candidates:
-                try:
-                    score = cosine_similarity(query_embedding, doc['embedding'])
-                    scored_candidates.append((score, doc))
-                except:
-                    continue
-            
-            # 4. Sort and slice
-            scored_candidates.sort(key=lambda x: x[0], reverse=True)
-            return [item[1] for item in scored_candidates[:top_k]]
+            # 3. Hydrate only the top-k documents with the fields the prompt uses, keeping score order
+            return self.store.get_articles_by_links(links)
 
         except Exception as e:
             logging.error(f"Retrieval error: {e}")
+            instrumentation.error("retrieval", mode=mode)
+            return []
+        finally:
+            instrumentation.observe("retrieval_seconds", time.perf_counter() - start, mode=mode)
+
+    def _rank(self, query, top_k, mode, get_vector_index, get_lexical_index, allowed_links):
+        """
+        Top-k links from one tier's indexes, optionally restricted to `allowed_links`.
+        """
+        # Lexical candidates
+        lexical_hits = []
+        if mode in ("lexical", "hybrid"):
+            lexical_hits = get_lexical_index().search(query, top_k=BM25_CANDIDATES, keys=allowed_links)
+            if mode == "lexical":
+                return [link for link, _ in lexical_hits[:top_k]]
+
+        # Get Query Embedding locally (cached per normalized query)
+        query_embedding = self.embed_query(query)
+
+        if not query_embedding:
             return []
 
-    def answer_query(self, query: str):
+        vector_index = get_vector_index()
+        if mode == "hybrid" and len(lexical_hits) >= top_k:
+            # Dense scoring only over the BM25 candidates, then fuse the two rankings
+            candidates = [link for link, _ in lexical_hits]
+            dense_hits = vector_index.search(query_embedding, top_k=len(candidates), keys=candidates)
+            fused = reciprocal_rank_fusion([candidates, [link for link, _ in dense_hits]], k=RRF_K)
+            return [link for link, _ in fused[:top_k]]
+
+        # Pure dense search (also the fallback when keywords match too few articles)
+        dense_hits = vector_index.search(query_embedding, top_k=top_k, keys=allowed_links)
+        if lexical_hits:
+            fused = reciprocal_rank_fusion([[link for link, _ in lexical_hits], [link for link, _ in dense_hits]], k=RRF_K)
+            return [link for link, _ in fused[:top_k]]
+        return [link for link, _ in dense_hits]
+
+    def answer_query(self, query: str, mode=RETRIEVAL_MODE):
         """
         Generates an answer using RAG.
         """
-        # Extract potential date from query (simple YYYY-MM-DD regex)
-        import re
-        date_pattern = r"\d{4}-\d{2}-\d{2}"
-        date_match = re.search(date_pattern, query)
-        date_filter = date_match.group(0) if date_match else None
+        # Extract a date scope from the query (YYYY-MM-DD, "today", "last 24h", "this week", ...)
+        date_range = resolve_date_range(query)
+        date_filter = date_range[2] if date_range else None
+
+        # Repeated questions against an unchanged corpus are answered from cache. The key holds
+        # the resolved range, not its label, so "today" stops matching yesterday's answer at midnight
+        self.store.sync()
+        cache_key = (normalize_query(query), range_key(date_range), mode, self.store.write_version)
+        cached = self.answers.get(cache_key)
+        if cached is not None:
+            return cached
         
-        context_docs = self.retrieve(query, date_filter=date_filter)
+        context_docs = self.retrieve(query, date_range=date_range, mode=mode)
         if not context_docs:
             if date_filter:
-                return f"No news found specifically for the date {date_filter} matching your query."
+                return f"No news found specifically for {date_filter} matching your query."
             return "No relevant news found to answer your query."
 
         # Format context
@@ -97,19 +182,22 @@ class RAGEngine:
         """
 
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful news assistant."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model=self.model_name,
-            )
-            return chat_completion.choices[0].message.content
+            with instrumentation.timer("llm_request_seconds", purpose="answer"):
+                chat_completion = self.client.chat.completions.create(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a helpful news assistant."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt,
+                        }
+                    ],
+                    model=self.model_name,
+                )
+            answer = chat_completion.choices[0].message.content
+            self.answers.set(cache_key, answer)
+            return answer
         except Exception as e:
             return f"Error: {e}"
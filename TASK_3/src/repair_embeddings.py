@@ -1,69 +1,203 @@
-
 import os
 import sys
+import argparse
 import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pymongo
+from pymongo import UpdateOne
+from bson import json_util
 
 # Add src to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from config import MONGO_URI, DB_NAME, COLLECTION_NAME
-    from utils_embeddings import get_embedding
+    from config import (MONGO_URI, DB_NAME, COLLECTION_NAME, EMBEDDING_BATCH_SIZE, EMBEDDING_STORAGE_DTYPE,
+                        REPAIR_BATCH_SIZE, REPAIR_WORKERS, REPAIR_CHECKPOINT_PATH)
+    from utils_embeddings import get_embeddings
+    from embedding_codec import encode_embedding
+    from store_mongo import bump_collection_version
+    import instrumentation
 except ImportError:
-    from src.config import MONGO_URI, DB_NAME, COLLECTION_NAME
-    from src.utils_embeddings import get_embedding
+    from src.config import (MONGO_URI, DB_NAME, COLLECTION_NAME, EMBEDDING_BATCH_SIZE, EMBEDDING_STORAGE_DTYPE,
+                            REPAIR_BATCH_SIZE, REPAIR_WORKERS, REPAIR_CHECKPOINT_PATH)
+    from src.utils_embeddings import get_embeddings
+    from src.embedding_codec import encode_embedding
+    from src.store_mongo import bump_collection_version
+    from src import instrumentation
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
-def repair_embeddings():
-    print("Connecting to MongoDB...")
-    client = pymongo.MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    collection = db[COLLECTION_NAME]
-    
-    # Find documents with missing or empty embeddings
-    cursor = collection.find({
-        "$or": [
-            {"embedding": {"$exists": False}},
-            {"embedding": []},
-            {"embedding": {"$size": 0}}
+# Documents with missing or empty embeddings (near-duplicates are never embedded)
+MISSING_EMBEDDING_QUERY = {
+    "$or": [
+        {"embedding": {"$exists": False}},
+        {"embedding": []},
+        {"embedding": {"$size": 0}}
+    ],
+    "duplicate_of": {"$exists": False}
+}
+REPAIR_FIELDS = {"_id": 1, "full_text": 1, "summary_rss": 1, "title": 1}
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json_util.loads(f.read())
+
+def save_checkpoint(path, state):
+    # Write-then-rename so a crash never leaves a truncated checkpoint
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json_util.dumps(state))
+    os.replace(tmp_path, path)
+
+def iter_pages(collection, after_id=None, page_size=REPAIR_BATCH_SIZE):
+    """
+    Yields pages of documents needing an embedding in `_id` order, with only the text fields.
+    Each page is a fresh indexed range query after the previous page's last `_id`, so no
+    cursor stays open while a page is being encoded.
+    """
+    while True:
+        query = dict(MISSING_EMBEDDING_QUERY)
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        page = list(collection.find(query, REPAIR_FIELDS).sort("_id", pymongo.ASCENDING).limit(page_size))
+        if not page:
+            return
+        yield page
+        after_id = page[-1]["_id"]
+
+def repair_text(doc):
+    # Use full_text if available, else summary
+    return doc.get('full_text') or doc.get('summary_rss') or doc.get('title', '')
+
+def _encode(texts):
+    # Runs in pool workers; the on-disk embedding cache is left to the parent process
+    return get_embeddings(texts, batch_size=EMBEDDING_BATCH_SIZE, use_cache=False)
+
+def repair_embeddings(batch_size=REPAIR_BATCH_SIZE, workers=REPAIR_WORKERS, checkpoint_path=REPAIR_CHECKPOINT_PATH,
+                      restart=False, collection=None):
+    """
+    Embeds every document that lacks an embedding, page by page: read `batch_size` documents
+    (text fields only), encode them in one batch, write them back with one bulk write and
+    checkpoint the last `_id`. An interrupted run resumes after the checkpoint.
+
+    With workers > 1 pages are encoded in a process pool while later pages are read; pages
+    are still written and checkpointed in `_id` order.
+    """
+    if collection is None:
+        print("Connecting to MongoDB...")
+        client = pymongo.MongoClient(MONGO_URI)
+        collection = client[DB_NAME][COLLECTION_NAME]
+
+    state = None if restart else load_checkpoint(checkpoint_path)
+    state = state or {"last_id": None, "updated": 0, "skipped": 0}
+    if state["last_id"] is not None:
+        print(f"Resuming after _id {state['last_id']} ({state['updated']} already updated).")
+
+    def finish_page(page, embeddable, embeddings):
+        # One bulk write per page; the checkpoint then moves past the whole page, skipped documents included
+        operations = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encode_embedding(embedding, EMBEDDING_STORAGE_DTYPE)}})
+            for doc, embedding in zip(embeddable, embeddings)
         ]
-    })
-    
-    docs_to_repair = list(cursor)
-    print(f"Found {len(docs_to_repair)} documents needing embeddings.")
-    
-    updated_count = 0
-    
-    for doc in docs_to_repair:
-        try:
-            # Use full_text if available, else summary
-            text = doc.get('full_text') or doc.get('summary_rss') or doc.get('title', '')
-            
-            if not text:
+        if operations:
+            state["updated"] += collection.bulk_write(operations, ordered=False).modified_count
+            # Running dashboards reload their vector index once they see the counter move
+            bump_collection_version(collection)
+        state["skipped"] += len(page) - len(embeddable)
+        state["last_id"] = page[-1]["_id"]
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, state)
+        print(f"Updated {state['updated']} articles...")
+
+    def embeddable_docs(page):
+        # Keep only documents that have something to embed
+        for doc in page:
+            if not repair_text(doc):
                 print(f"Skipping {doc['_id']} - No text content.")
-                continue
-                
-            # Generate embedding
-            embedding = get_embedding(text)
-            
-            if embedding:
-                collection.update_one(
-                    {"_id": doc["_id"]},
-                    {"$set": {"embedding": embedding}}
-                )
-                updated_count += 1
-                if updated_count % 5 == 0:
-                    print(f"Updated {updated_count} articles...")
-            else:
-                print(f"Failed to generate embedding for {doc['_id']}")
-                
-        except Exception as e:
-            print(f"Error updating doc {doc.get('title', 'Unknown')}: {e}")
-            
-    print(f"Repair Complete. Updated {updated_count} documents.")
+        return [doc for doc in page if repair_text(doc)]
+
+    # A failed encode or write stops the job; re-running resumes after the last finished page
+    pages = iter_pages(collection, state["last_id"], batch_size)
+    if workers and workers > 1:
+        # Spawned workers load their own model; at most 2 pages per worker are in flight and
+        # pages are finished oldest first so the checkpoint never skips an unwritten page
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            in_flight = deque()
+            for page in pages:
+                embeddable = embeddable_docs(page)
+                future = pool.submit(_encode, [repair_text(doc) for doc in embeddable]) if embeddable else None
+                in_flight.append((page, embeddable, future))
+                while in_flight and (len(in_flight) >= workers * 2 or in_flight[0][2] is None or in_flight[0][2].done()):
+                    page, embeddable, future = in_flight.popleft()
+                    finish_page(page, embeddable, future.result() if future else [])
+            while in_flight:
+                page, embeddable, future = in_flight.popleft()
+                finish_page(page, embeddable, future.result() if future else [])
+    else:
+        for page in pages:
+            embeddable = embeddable_docs(page)
+            # Generate embeddings for the whole page in one call
+            embeddings = get_embeddings([repair_text(doc) for doc in embeddable]) if embeddable else []
+            finish_page(page, embeddable, embeddings)
+
+    print(f"Repair Complete. Updated {state['updated']} documents, skipped {state['skipped']} without text.")
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state
+
+def migrate_embeddings_to_binary(dtype=EMBEDDING_STORAGE_DTYPE, batch_size=500):
+    """
+    One-shot migration of legacy list-of-doubles embeddings to the compact binary format.
+    Safe to re-run: documents already in binary form are not matched.
+    """
+    print("Connecting to MongoDB...")
+    client = pymongo.MongoClient(MONGO_URI)
+    collection = client[DB_NAME][COLLECTION_NAME]
+
+    cursor = collection.find(
+        {"embedding.0": {"$exists": True}, "embedding": {"$type": "array"}},
+        {"_id": 1, "embedding": 1}
+    ).batch_size(batch_size)
+
+    def write(operations):
+        modified = collection.bulk_write(operations, ordered=False).modified_count
+        # Running dashboards reload their vector index once they see the counter move
+        if modified:
+            bump_collection_version(collection)
+        return modified
+
+    migrated = 0
+    operations = []
+    for doc in cursor:
+        operations.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"embedding": encode_embedding(doc["embedding"], dtype)}}
+        ))
+        if len(operations) >= batch_size:
+            migrated += write(operations)
+            operations = []
+            print(f"Migrated {migrated} embeddings...")
+    if operations:
+        migrated += write(operations)
+
+    print(f"Migration Complete. Converted {migrated} embeddings to {dtype} binary.")
 
 if __name__ == "__main__":
-    repair_embeddings()
+    parser = argparse.ArgumentParser(description="Repair or migrate article embeddings.")
+    parser.add_argument("--migrate", action="store_true", help="Convert legacy list embeddings to binary storage")
+    parser.add_argument("--batch-size", type=int, default=REPAIR_BATCH_SIZE, help="Documents per page")
+    parser.add_argument("--workers", type=int, default=REPAIR_WORKERS, help="Encoder processes (0 = in-process)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_embeddings_to_binary()
+    else:
+        repair_embeddings(batch_size=args.batch_size, workers=args.workers, restart=args.restart)
+    instrumentation.export_snapshot()
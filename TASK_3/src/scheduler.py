@@ -0,0 +1,232 @@
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Ensure src is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    from config import (RSS_FEEDS, UPDATE_INTERVAL_SECONDS, SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL,
+                        SCHEDULER_TICK_SECONDS, RETENTION_HOT_DAYS,
+                        RETENTION_INTERVAL_SECONDS)
+    from ingest_rss import RSSIngester
+    from process_llm import ArticleProcessor
+    from store_mongo import MongoStore
+    from pipeline import StreamingPipeline
+    import instrumentation
+except ImportError:
+    from src.config import (RSS_FEEDS, UPDATE_INTERVAL_SECONDS, SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL,
+                            SCHEDULER_TICK_SECONDS, RETENTION_HOT_DAYS,
+                            RETENTION_INTERVAL_SECONDS)
+    from src.ingest_rss import RSSIngester
+    from src.process_llm import ArticleProcessor
+    from src.store_mongo import MongoStore
+    from src.pipeline import StreamingPipeline
+    from src import instrumentation
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+
+class FeedSchedule:
+    """
+    Polling state for one feed. The interval halves after a poll that found new
+    articles and grows by half after a quiet or failed one, within [min, max].
+    """
+    def __init__(self, category, url, interval=UPDATE_INTERVAL_SECONDS):
+        self.category = category
+        self.url = url
+        self.interval = interval
+        self.next_run = time.time()
+        self.last_run = None
+        self.last_new = None
+        self.last_error = None
+        self.polls = 0
+        self.total_new = 0
+
+    def record(self, new_items=0, error=None, min_interval=SCHEDULER_MIN_INTERVAL, max_interval=SCHEDULER_MAX_INTERVAL):
+        now = time.time()
+        self.polls += 1
+        self.last_run = now
+        self.last_error = error
+        self.last_new = new_items
+        self.total_new += new_items
+        if new_items and not error:
+            self.interval = max(min_interval, self.interval / 2)
+        else:
+            self.interval = min(max_interval, self.interval * 1.5)
+        self.next_run = now + self.interval
+
+    def as_dict(self):
+        return {
+            "category": self.category,
+            "url": self.url,
+            "interval_s": round(self.interval),
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat(timespec='seconds'),
+            "last_run": datetime.fromtimestamp(self.last_run).isoformat(timespec='seconds') if self.last_run else None,
+            "last_new": self.last_new,
+            "total_new": self.total_new,
+            "polls": self.polls,
+            "last_error": self.last_error
+        }
+
+
+class IngestionScheduler:
+    """
+    Background ingestion service. A daemon thread wakes every `tick` seconds, polls the
+    feeds that are due through the streaming pipeline (fetch -> enrich -> embed -> store)
+    and reschedules each feed on its own adaptive interval. Every RETENTION_INTERVAL_SECONDS
+    it also moves articles past the retention window to the archive.
+
+    Runs inside the dashboard process (start()) or as a standalone worker (`python src/scheduler.py`).
+    A dashboard in another process picks up the worker's writes through MongoStore.sync(),
+    within STORE_SYNC_INTERVAL seconds.
+    """
+
+    def __init__(self, store=None, processor=None, feeds=None, tick=SCHEDULER_TICK_SECONDS):
+        self.store = store if store is not None else MongoStore()
+        self.processor = processor if processor is not None else ArticleProcessor()
+        feeds = feeds if feeds is not None else RSS_FEEDS
+        self.schedules = [FeedSchedule(category, url) for category, urls in feeds.items() for url in urls]
+        # One ingester for the scheduler's lifetime, so its pooled connections and per-host
+        # extraction profiles carry over from one poll to the next
+        self.ingester = RSSIngester(feeds=feeds, store=self.store)
+        self.tick = tick
+        self.last_report = None
+        self.last_cycle_at = None
+        self.cycles = 0
+        self.last_archive_at = None
+        self.last_archived = 0
+        self.busy = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # --- Control ---
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="ingestion-scheduler", daemon=True)
+        self._thread.start()
+        logging.info(f"Ingestion scheduler started for {len(self.schedules)} feeds.")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger_now(self):
+        """
+        Marks every feed as due and wakes the scheduler. Returns immediately.
+        """
+        for schedule in self.schedules:
+            schedule.next_run = time.time()
+        self._wake.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Loop ---
+
+    def run_forever(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.run_due()
+                    self.maybe_archive()
+                except Exception as e:
+                    logging.error(f"Scheduler cycle failed: {e}")
+                self._wake.wait(self.tick)
+                self._wake.clear()
+        finally:
+            # Closed once the loop is out of any cycle, never under a running pipeline
+            self.ingester.close()
+
+    def run_due(self):
+        """
+        Runs one pipeline over all feeds that are currently due. Returns the pipeline report, or None.
+        """
+        now = time.time()
+        due = [s for s in self.schedules if s.next_run <= now]
+        if not due:
+            return None
+
+        feeds = {}
+        for schedule in due:
+            feeds.setdefault(schedule.category, []).append(schedule.url)
+
+        self.busy = True
+        try:
+            pipeline = StreamingPipeline(store=self.store, ingester=self.ingester, processor=self.processor, feeds=feeds)
+            report = pipeline.run()
+        finally:
+            self.busy = False
+
+        for schedule in due:
+            result = self.ingester.feed_results.get(schedule.url, {"error": "not polled"})
+            schedule.record(new_items=result.get("new", 0), error=result.get("error"))
+
+        self.cycles += 1
+        self.last_cycle_at = time.time()
+        self.last_report = report
+        return report
+
+    def maybe_archive(self):
+        """
+        Runs the retention job if it is due, so the hot collection and its resident indexes
+        stay bounded. Returns the archived links.
+        """
+        if not RETENTION_HOT_DAYS:
+            return []
+        if self.last_archive_at is not None and time.time() - self.last_archive_at < RETENTION_INTERVAL_SECONDS:
+            return []
+        self.last_archive_at = time.time()
+        self.busy = True
+        try:
+            archived = self.store.archive_older_than()
+        finally:
+            self.busy = False
+        self.last_archived = len(archived)
+        self.export_metrics()
+        # Archived stories stop anchoring near-duplicate matches, which keeps the signature index bounded too
+        dedup = getattr(self.processor, 'dedup', None)
+        if archived and dedup is not None:
+            dedup.remove(archived)
+        return archived
+
+    def export_metrics(self):
+        """
+        Writes the instrumentation snapshot (JSON and Prometheus text) for external scrapers.
+        """
+        instrumentation.export_snapshot()
+
+    # --- Status ---
+
+    def status(self):
+        upcoming = min((s.next_run for s in self.schedules), default=None)
+        return {
+            "running": self.running,
+            "busy": self.busy,
+            "cycles": self.cycles,
+            "last_cycle_at": datetime.fromtimestamp(self.last_cycle_at).isoformat(timespec='seconds') if self.last_cycle_at else None,
+            "next_poll_in_s": max(0, round(upcoming - time.time())) if upcoming else None,
+            "last_archive_at": datetime.fromtimestamp(self.last_archive_at).isoformat(timespec='seconds') if self.last_archive_at else None,
+            "last_archived": self.last_archived,
+            "last_report": self.last_report,
+            "feeds": [s.as_dict() for s in self.schedules]
+        }
+
+
+if __name__ == "__main__":
+    scheduler = IngestionScheduler()
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+        print(json.dumps(scheduler.status(), indent=4))
@@ -1,59 +1,538 @@
 
 import pymongo
+from pymongo import UpdateOne, ReplaceOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+import argparse
 import json
 import os
 import sys
+import time
 import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 from typing import List, Dict
 
 # Ensure src is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
-    from config import MONGO_URI, DB_NAME, COLLECTION_NAME
+    from config import (MONGO_URI, DB_NAME, COLLECTION_NAME, MONGO_BULK_BATCH_SIZE, VECTOR_INDEX_MODE, VECTOR_INDEX_NLIST,
+                        VECTOR_INDEX_NPROBE, EMBEDDING_STORAGE_DTYPE, RETENTION_HOT_DAYS, ARCHIVE_COLLECTION_NAME,
+                        ARCHIVE_BLOCK_COMPRESSOR, ARCHIVE_QUERY_MAX_DOCS, ARCHIVE_INDEX_CACHE_SIZE,
+                        STORE_META_COLLECTION_NAME, STORE_SYNC_INTERVAL)
+    from vector_index import VectorIndex
+    from bm25_index import BM25Index
+    from cache_utils import LRUCache
+    from embedding_codec import encode_embedding, decode_embedding, has_embedding
+    from date_utils import parse_published
+    import instrumentation
 except ImportError:
-    from src.config import MONGO_URI, DB_NAME, COLLECTION_NAME
+    from src.config import (MONGO_URI, DB_NAME, COLLECTION_NAME, MONGO_BULK_BATCH_SIZE, VECTOR_INDEX_MODE, VECTOR_INDEX_NLIST,
+                            VECTOR_INDEX_NPROBE, EMBEDDING_STORAGE_DTYPE, RETENTION_HOT_DAYS, ARCHIVE_COLLECTION_NAME,
+                            ARCHIVE_BLOCK_COMPRESSOR, ARCHIVE_QUERY_MAX_DOCS, ARCHIVE_INDEX_CACHE_SIZE,
+                            STORE_META_COLLECTION_NAME, STORE_SYNC_INTERVAL)
+    from src.vector_index import VectorIndex
+    from src.bm25_index import BM25Index
+    from src.cache_utils import LRUCache
+    from src.embedding_codec import encode_embedding, decode_embedding, has_embedding
+    from src.date_utils import parse_published
+    from src import instrumentation
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
+# Read projections: what each view actually needs
+LISTING_FIELDS = {"_id": 0, "title": 1, "link": 1, "published": 1, "source_url": 1,
+                  "category": 1, "sentiment": 1, "llm_summary": 1}
+EMBEDDING_FIELDS = {"_id": 0, "link": 1, "embedding": 1}
+CONTEXT_FIELDS = {"_id": 0, "title": 1, "link": 1, "published": 1, "llm_summary": 1}
+LEXICAL_FIELDS = {"_id": 0, "link": 1, "title": 1, "summary_rss": 1, "llm_summary": 1}
+
+def lexical_text(article):
+    """
+    Text indexed for BM25: title, RSS summary and LLM summary.
+    """
+    return " ".join(str(article.get(field) or "") for field in ("title", "summary_rss", "llm_summary"))
+
+def bump_collection_version(collection):
+    """
+    Increments the shared write counter of `collection` (one small document in the meta
+    collection) and returns the new value. Every process writing articles calls this, so
+    readers in other processes can tell that their resident state is stale.
+    """
+    doc = collection.database[STORE_META_COLLECTION_NAME].find_one_and_update(
+        {"_id": collection.name}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
 class MongoStore:
-    def __init__(self):
+    def __init__(self, uri=MONGO_URI, db_name=DB_NAME, collection_name=COLLECTION_NAME, client=None,
+                 archive_collection_name=ARCHIVE_COLLECTION_NAME):
+        """
+        `client` accepts a ready MongoClient-compatible object (e.g. mongomock for benchmarks).
+        `collection_name` holds the hot (indexed) articles, `archive_collection_name` the ones
+        moved out by archive_older_than().
+        """
+        self.vector_index = None
+        self.lexical_index = None
+        # Guards the lazy index builds and the incremental updates made by writes (the scheduler
+        # thread writes while dashboard sessions query), so no batch falls between the two.
+        # Reentrant so a failed update can drop the indexes while still holding it
+        self._index_lock = threading.RLock()
+        # Bumped on every successful write, ours or (through sync) another process's;
+        # caches key on it to invalidate themselves
+        self.write_version = 0
+        self._seen_version = 0
+        self._last_sync = time.monotonic()
+        # Per-date-range indexes over the archive, built on demand
+        self.archive_indexes = LRUCache(max_entries=ARCHIVE_INDEX_CACHE_SIZE)
         try:
-            self.client = pymongo.MongoClient(MONGO_URI)
-            self.db = self.client[DB_NAME]
-            self.collection = self.db[COLLECTION_NAME]
+            self.client = client if client is not None else pymongo.MongoClient(uri)
+            self.db = self.client[db_name]
+            self.collection = self.db[collection_name]
             
             # Create Index on Link (unique) to avoid duplicates
             self.collection.create_index("link", unique=True)
+            # Indexes backing dashboard aggregations
+            for field in ("category", "sentiment", "source_url", "ingested_at"):
+                self.collection.create_index(field)
+            # Indexes backing date-scoped retrieval and recency sorts
+            self.collection.create_index([("published_at", pymongo.DESCENDING)])
+            self.collection.create_index([("category", pymongo.ASCENDING), ("published_at", pymongo.DESCENDING)])
+            self.collection.create_index([("sentiment", pymongo.ASCENDING), ("published_at", pymongo.DESCENDING)])
+            self.archive = self._archive_collection(archive_collection_name)
+            self._seen_version = self._shared_version()
             logging.info("Connected to MongoDB and ensured indexes.")
         except Exception as e:
             logging.error(f"MongoDB Connection Error: {e}")
 
-    def store_articles(self, json_path="data/processed/processed_articles.json"):
-        if not os.path.exists(json_path):
-            logging.error(f"File {json_path} not found.")
-            return
+    def _archive_collection(self, name):
+        """
+        The archive tier: created with heavier block compression (it is written once and read
+        rarely) and indexed only for link lookups and date-range scans.
+        """
+        if name not in self.db.list_collection_names():
+            try:
+                self.db.create_collection(name, storageEngine={
+                    "wiredTiger": {"configString": f"block_compressor={ARCHIVE_BLOCK_COMPRESSOR}"}
+                })
+            except Exception as e:
+                logging.warning(f"Could not create compressed archive collection, using defaults: {e}")
+        archive = self.db[name]
+        archive.create_index("link", unique=True)
+        archive.create_index([("published_at", pymongo.DESCENDING)])
+        return archive
+
+    def _shared_version(self):
+        doc = self.db[STORE_META_COLLECTION_NAME].find_one({"_id": self.collection.name})
+        return doc["version"] if doc else 0
+
+    def _record_write(self):
+        """
+        Called after every successful write: bumps the shared and the local version. A jump of
+        more than one means another process wrote meanwhile, so the resident indexes are dropped.
+        """
+        version = bump_collection_version(self.collection)
+        if version != self._seen_version + 1:
+            self._drop_indexes()
+        self._seen_version = version
+        self.write_version += 1
+
+    def _drop_indexes(self):
+        # Rebuilt lazily on the next query
+        with self._index_lock:
+            self.vector_index = None
+            self.lexical_index = None
+
+    def sync(self, max_age=STORE_SYNC_INTERVAL):
+        """
+        Picks up writes made by other processes (a standalone scheduler, repair_embeddings, ...):
+        at most every `max_age` seconds the shared write counter is read, and if it moved the
+        resident indexes are rebuilt and write_version is bumped. Returns True if stale.
+        """
+        if time.monotonic() - self._last_sync < max_age:
+            return False
+        self._last_sync = time.monotonic()
+        version = self._shared_version()
+        if version == self._seen_version:
+            return False
+        logging.info("Articles were written by another process; reloading indexes.")
+        self._seen_version = version
+        self._drop_indexes()
+        self.write_version += 1
+        return True
+
+    def store_articles(self, articles="data/processed/processed_articles.json", batch_size=MONGO_BULK_BATCH_SIZE):
+        """
+        Upserts articles (by link) with unordered bulk writes of `batch_size` operations.
+        `articles` is either a path to a processed JSON file or any iterable of article dicts.
+        Returns totals: {"inserted", "updated", "failed", "batches", "written"}, where
+        "written" lists the links that were actually upserted.
+        """
+        totals = {"inserted": 0, "updated": 0, "failed": 0, "batches": 0, "written": []}
+        if isinstance(articles, (str, os.PathLike)):
+            json_path = articles
+            if not os.path.exists(json_path):
+                logging.error(f"File {json_path} not found.")
+                return totals
+
+            with open(json_path, 'r', encoding='utf-8') as f:
+                articles = json.load(f)
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            articles = json.load(f)
+        iterator = iter(articles)
+        while True:
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                break
+            # Articles without a link can't be upserted; they count as failed, not as end of input
+            batch = [a for a in chunk if a.get('link')]
+            totals["failed"] += len(chunk) - len(batch)
+            if not batch:
+                continue
+            stats = self._write_batch(batch)
+            totals["batches"] += 1
+            for key in ("inserted", "updated", "failed", "written"):
+                totals[key] += stats[key]
+            logging.info(f"Batch {totals['batches']}: {stats['inserted']} inserted, "
+                         f"{stats['updated']} updated, {stats['failed']} failed.")
 
-        count = 0
-        for article in articles:
+        if totals['inserted'] or totals['updated']:
+            self._record_write()
+
+        logging.info(f"Successfully stored/updated {totals['inserted'] + totals['updated']} articles in MongoDB "
+                     f"({totals['failed']} failed).")
+        return totals
+
+    def to_document(self, article):
+        """
+        Copy of `article` as written to MongoDB: the embedding is packed into compact binary
+        and `published_at` becomes a real UTC datetime.
+        """
+        doc = dict(article)
+        published_at = parse_published(doc.get('published_at')) or parse_published(doc.get('published'))
+        if published_at:
+            doc['published_at'] = published_at
+        embedding = doc.get('embedding')
+        if has_embedding(embedding) and not isinstance(embedding, bytes):
+            doc['embedding'] = encode_embedding(embedding, EMBEDDING_STORAGE_DTYPE)
+        return doc
+
+    def _write_batch(self, batch):
+        # Upsert based on link
+        operations = []
+        for a in batch:
+            update = {"$set": self.to_document(a)}
+            if not a.get('duplicate_of'):
+                update["$unset"] = {"duplicate_of": ""}
+            operations.append(UpdateOne({"link": a['link']}, update, upsert=True))
+        failed_positions = set()
+        start = time.perf_counter()
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            failed_positions = {err['index'] for err in details.get('writeErrors', [])}
+            for err in details.get('writeErrors', []):
+                logging.error(f"Error storing article {batch[err['index']].get('title')}: {err.get('errmsg')}")
+            instrumentation.error("mongo_write", amount=len(failed_positions))
+        except Exception as e:
+            logging.error(f"Bulk write failed for {len(batch)} articles: {e}")
+            instrumentation.error("mongo_write", amount=len(batch))
+            return {"inserted": 0, "updated": 0, "failed": len(batch), "written": []}
+        finally:
+            instrumentation.observe("mongo_write_seconds", time.perf_counter() - start)
+
+        # Keep the resident indexes in step with the collection; near-duplicates stay out of
+        # retrieval so one story doesn't fill the RAG context several times
+        written = [a for i, a in enumerate(batch) if i not in failed_positions]
+        duplicates = [a['link'] for a in written if a.get('duplicate_of')]
+        indexed = [a for a in written if not a.get('duplicate_of') and has_embedding(a.get('embedding'))]
+        with self._index_lock:
             try:
-                # Upsert based on link
-                self.collection.update_one(
-                    {"link": article['link']},
-                    {"$set": article},
-                    upsert=True
-                )
-                count += 1
+                # An index still unbuilt here is built after the bulk write and so already sees this batch
+                if self.vector_index is not None:
+                    if duplicates:
+                        self.vector_index.remove(duplicates)
+                    if indexed:
+                        self.vector_index.upsert([a['link'] for a in indexed], [decode_embedding(a['embedding']) for a in indexed])
+                if self.lexical_index is not None:
+                    self.lexical_index.remove(duplicates)
+                    for article in written:
+                        if not article.get('duplicate_of'):
+                            self.lexical_index.upsert(article['link'], lexical_text(article))
             except Exception as e:
-                logging.error(f"Error storing article {article.get('title')}: {e}")
+                # The rows are already in MongoDB: rebuild from there on the next query rather
+                # than fail the write (e.g. an embedding dimension change after a model switch)
+                logging.error(f"Incremental index update failed, indexes will be rebuilt: {e}")
+                instrumentation.error("index_update")
+                self._drop_indexes()
 
-        logging.info(f"Successfully stored/updated {count} articles in MongoDB.")
+        return {
+            "inserted": details.get('nUpserted', 0),
+            "updated": details.get('nMatched', 0),
+            "failed": len(failed_positions),
+            "written": [a['link'] for a in written]
+        }
+
+    def get_vector_index(self):
+        """
+        Returns the resident vector index, loading it from MongoDB on first use.
+        Only `link` and `embedding` are read; later writes update it incrementally.
+        """
+        if self.vector_index is not None:
+            return self.vector_index
+        with self._index_lock:
+            if self.vector_index is not None:
+                return self.vector_index
+            index = VectorIndex(mode=VECTOR_INDEX_MODE, nlist=VECTOR_INDEX_NLIST, nprobe=VECTOR_INDEX_NPROBE)
+            links, vectors = [], []
+            for link, vector in self.iter_embeddings():
+                links.append(link)
+                vectors.append(vector)
+            if links:
+                index.upsert(links, vectors)
+            self.vector_index = index
+            logging.info(f"Loaded vector index with {len(index)} embeddings.")
+            return index
+
+    def get_lexical_index(self):
+        """
+        Returns the resident BM25 index, built from title/summary fields on first use and
+        updated incrementally by later writes. Near-duplicates are left out.
+        """
+        if self.lexical_index is not None:
+            return self.lexical_index
+        with self._index_lock:
+            if self.lexical_index is not None:
+                return self.lexical_index
+            index = BM25Index()
+            for doc in self.collection.find({"duplicate_of": {"$exists": False}}, LEXICAL_FIELDS).batch_size(1000):
+                if doc.get('link'):
+                    index.upsert(doc['link'], lexical_text(doc))
+            self.lexical_index = index
+            logging.info(f"Loaded BM25 index with {len(index)} documents.")
+            return index
+
+    def get_known_links(self, links):
+        """
+        Returns the subset of `links` already stored, in one `$in` query on the unique link index.
+        """
+        links = list(links)
+        if not links:
+            return set()
+        cursor = self.collection.find({"link": {"$in": links}}, {"_id": 0, "link": 1})
+        known = {doc['link'] for doc in cursor}
+        # Archived articles count as known too, so feeds that keep old items don't bring them back
+        missing = [link for link in links if link not in known]
+        if missing:
+            known.update(doc['link'] for doc in self.archive.find({"link": {"$in": missing}}, {"_id": 0, "link": 1}))
+        return known
+
+    def get_enrichment(self, links):
+        """
+        Returns {link: doc} with the stored content hash and enrichment fields for `links`,
+        in one `$in` query. Embeddings are returned as plain lists.
+        """
+        links = list(links)
+        if not links:
+            return {}
+        projection = {"_id": 0, "link": 1, "content_hash": 1, "llm_summary": 1, "category": 1,
+                      "sentiment": 1, "embedding": 1, "processed_at": 1, "duplicate_of": 1}
+        found = {}
+        for doc in self.collection.find({"link": {"$in": links}}, projection):
+            if 'embedding' in doc:
+                doc['embedding'] = decode_embedding(doc['embedding']).tolist()
+            found[doc['link']] = doc
+        return found
 
     def get_recent_articles(self, limit=20):
-        return list(self.collection.find().sort("published", -1).limit(limit))
+        return list(self.collection.find().sort("published_at", -1).limit(limit))
+
+    def get_article_listing(self, limit=100):
+        """
+        Light view for the dashboard: only the fields it displays (no full_text, no embedding).
+        """
+        return list(self.collection.find({}, LISTING_FIELDS).sort("published_at", -1).limit(limit))
+
+    def get_links_in_range(self, start=None, end=None, category=None, sentiment=None):
+        """
+        Links of articles published in [start, end), optionally narrowed by category/sentiment.
+        Served by the published_at (and compound) indexes as a range scan.
+        """
+        query = {}
+        if start or end:
+            query["published_at"] = {}
+            if start:
+                query["published_at"]["$gte"] = start
+            if end:
+                query["published_at"]["$lt"] = end
+        if category:
+            query["category"] = category
+        if sentiment:
+            query["sentiment"] = sentiment
+        return [doc['link'] for doc in self.collection.find(query, {"_id": 0, "link": 1})]
+
+    def backfill_published_at(self, batch_size=MONGO_BULK_BATCH_SIZE):
+        """
+        Parses `published` into `published_at` for documents stored before the field existed.
+        Returns the number of documents updated.
+        """
+        cursor = self.collection.find(
+            {"published_at": {"$exists": False}},
+            {"_id": 1, "published": 1, "ingested_at": 1}
+        ).batch_size(batch_size)
+
+        updated = 0
+        operations = []
+        for doc in cursor:
+            published_at = parse_published(doc.get('published')) or parse_published(doc.get('ingested_at'))
+            if published_at is None:
+                continue
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"published_at": published_at}}))
+            if len(operations) >= batch_size:
+                updated += self.collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += self.collection.bulk_write(operations, ordered=False).modified_count
+
+        if updated:
+            self._record_write()
+        logging.info(f"Backfilled published_at on {updated} documents.")
+        return updated
+
+    def iter_embeddings(self, query=None, batch_size=1000):
+        """
+        Embedding-only view for scoring: yields (link, float32 vector) for documents with an
+        embedding, skipping near-duplicates.
+        """
+        mongo_query = {"embedding": {"$exists": True, "$ne": []}, "duplicate_of": {"$exists": False}}
+        if query:
+            mongo_query.update(query)
+        cursor = self.collection.find(mongo_query, EMBEDDING_FIELDS).batch_size(batch_size)
+        for doc in cursor:
+            if doc.get('link') and has_embedding(doc.get('embedding')):
+                yield doc['link'], decode_embedding(doc['embedding'])
+
+    def get_articles_by_links(self, links, fields=CONTEXT_FIELDS):
+        """
+        Hydrates the given articles (e.g. the final top-k) with `fields`, preserving the order of `links`.
+        Links not in the hot collection are looked up in the archive.
+        """
+        links = list(links)
+        if not links:
+            return []
+        docs = {doc['link']: doc for doc in self.collection.find({"link": {"$in": links}}, fields)}
+        missing = [link for link in links if link not in docs]
+        if missing:
+            docs.update((doc['link'], doc) for doc in self.archive.find({"link": {"$in": missing}}, fields))
+        return [docs[link] for link in links if link in docs]
+
+    # --- Retention ---
+
+    def hot_cutoff(self, now=None):
+        """
+        Oldest `published_at` kept in the hot collection, or None when retention is off.
+        """
+        if not RETENTION_HOT_DAYS:
+            return None
+        return (now or datetime.now(timezone.utc)) - timedelta(days=RETENTION_HOT_DAYS)
+
+    def archive_older_than(self, cutoff=None, batch_size=MONGO_BULK_BATCH_SIZE):
+        """
+        Moves articles published before `cutoff` (default: the retention window) from the hot
+        collection to the archive, oldest first, one batch at a time. Each batch is upserted into
+        the archive before it is deleted from the hot collection, so an interrupted run loses
+        nothing and can simply be repeated. Archived articles also leave the resident vector
+        and BM25 indexes. Returns the archived links.
+        """
+        cutoff = cutoff or self.hot_cutoff()
+        if cutoff is None:
+            return []
+
+        archived = []
+        while True:
+            batch = list(self.collection.find({"published_at": {"$lt": cutoff}})
+                         .sort("published_at", pymongo.ASCENDING).limit(batch_size))
+            if not batch:
+                break
+            start = time.perf_counter()
+            self.archive.bulk_write([
+                ReplaceOne({"link": doc['link']}, {k: v for k, v in doc.items() if k != '_id'}, upsert=True)
+                for doc in batch
+            ], ordered=False)
+            self.collection.delete_many({"_id": {"$in": [doc['_id'] for doc in batch]}})
+            instrumentation.observe("archive_batch_seconds", time.perf_counter() - start)
+
+            links = [doc['link'] for doc in batch]
+            with self._index_lock:
+                if self.vector_index is not None:
+                    self.vector_index.remove(links)
+                if self.lexical_index is not None:
+                    self.lexical_index.remove(links)
+            archived.extend(links)
+
+        if archived:
+            self._record_write()
+            instrumentation.increment("articles_archived_total", len(archived))
+        logging.info(f"Archived {len(archived)} articles published before {cutoff.isoformat()}.")
+        return archived
+
+    def archive_newest(self):
+        """
+        `published_at` of the newest archived article (one indexed lookup), or None if the archive is empty.
+        Read fresh each time, since the archive job may run in another process.
+        """
+        newest = self.archive.find_one({}, {"_id": 0, "published_at": 1}, sort=[("published_at", pymongo.DESCENDING)])
+        return parse_published(newest.get('published_at')) if newest else None
+
+    def archive_reaches(self, start):
+        """
+        True if a date range starting at `start` (None = unbounded) overlaps archived articles.
+        """
+        newest = self.archive_newest()
+        return newest is not None and (start is None or parse_published(start) <= newest)
+
+    def get_archive_indexes(self, start=None, end=None, limit=ARCHIVE_QUERY_MAX_DOCS):
+        """
+        Temporary (VectorIndex, BM25Index) over archived articles published in [start, end),
+        newest first and at most `limit` of them, for questions that name an older date.
+        Built from one indexed range scan and kept in a small LRU until the archive grows.
+        The range is widened to whole UTC days so relative ranges ("last 60 days") share a key.
+        """
+        def day_floor(value):
+            value = parse_published(value)
+            return value.replace(hour=0, minute=0, second=0, microsecond=0) if value else None
+
+        start = day_floor(start)
+        if end is not None:
+            end_day = day_floor(end)
+            end = end_day if end_day == parse_published(end) else end_day + timedelta(days=1)
+        key = (start, end, limit, self.archive_newest())
+        cached = self.archive_indexes.get(key)
+        if cached is not None:
+            return cached
+
+        query = {"duplicate_of": {"$exists": False}}
+        if start or end:
+            query["published_at"] = {}
+            if start:
+                query["published_at"]["$gte"] = start
+            if end:
+                query["published_at"]["$lt"] = end
+        vector_index, lexical_index = VectorIndex(mode="exact"), BM25Index()
+        links, vectors = [], []
+        cursor = self.archive.find(query, {**LEXICAL_FIELDS, "embedding": 1}).sort("published_at", pymongo.DESCENDING)
+        for doc in cursor.limit(limit).batch_size(1000):
+            lexical_index.upsert(doc['link'], lexical_text(doc))
+            if has_embedding(doc.get('embedding')):
+                links.append(doc['link'])
+                vectors.append(decode_embedding(doc['embedding']))
+        if links:
+            vector_index.upsert(links, vectors)
+        logging.info(f"Built archive indexes over {len(lexical_index)} articles.")
+        self.archive_indexes.set(key, (vector_index, lexical_index))
+        return vector_index, lexical_index
 
     def get_stats(self):
         pipeline = [
@@ -61,6 +540,44 @@ class MongoStore:
         ]
         return list(self.collection.aggregate(pipeline))
 
+    def count_by(self, field, query=None):
+        """
+        Server-side {value: count} for an indexed field, over the whole collection or the
+        documents matching `query`. Sorting on the field first lets MongoDB walk its index
+        instead of the documents.
+        """
+        pipeline = [{"$match": query}] if query else []
+        pipeline += [
+            {"$sort": {field: 1}},
+            {"$project": {"_id": 0, field: 1}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ]
+        return {str(row['_id']) if row['_id'] is not None else "Unknown": row['count']
+                for row in self.collection.aggregate(pipeline)}
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store processed articles in MongoDB.")
+    parser.add_argument("--backfill-dates", action="store_true", help="Fill published_at on existing documents")
+    parser.add_argument("--archive", action="store_true", help="Move articles older than the retention window to the archive")
+    args = parser.parse_args()
+
     store = MongoStore()
-    store.store_articles()
+    if args.backfill_dates:
+        store.backfill_published_at()
+    elif args.archive:
+        store.archive_older_than()
+    else:
+        processed_path = "data/processed/processed_articles.json"
+        totals = store.store_articles(processed_path)
+        if os.path.exists(processed_path):
+            # Adopt the feed validators staged by the ingest step for the feeds now fully stored
+            try:
+                from ingest_rss import FeedValidatorCache
+            except ImportError:
+                from src.ingest_rss import FeedValidatorCache
+            validators = FeedValidatorCache()
+            if validators.load_pending():
+                with open(processed_path, 'r', encoding='utf-8') as f:
+                    validators.commit_stored(json.load(f), totals['written'])
+    instrumentation.export_snapshot()
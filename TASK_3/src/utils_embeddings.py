@@ -1,24 +1,107 @@
 
 import logging
-from sentence_transformers import SentenceTransformer
+import numpy as np
 import sys
 import os
 
+# Ensure src is in path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+try:
+    from config import (EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+                        EMBEDDING_BACKEND, EMBEDDING_ONNX_DIR, EMBEDDING_DIM)
+    from embedding_cache import EmbeddingCache
+    import instrumentation
+except ImportError:
+    from src.config import (EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+                            EMBEDDING_BACKEND, EMBEDDING_ONNX_DIR, EMBEDDING_DIM)
+    from src.embedding_cache import EmbeddingCache
+    from src import instrumentation
+
 # Create a singleton for the model to avoid reloading it multiple times
 _model = None
+_cache = None
+
+def embedding_model_id():
+    """
+    Model identity for cache keys: ONNX (especially int8) vectors differ slightly from the
+    PyTorch ones, so each backend keeps its own cache entries.
+    """
+    return EMBEDDING_MODEL if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}"
 
 def get_embedding_model():
     global _model
     if _model is None:
         try:
-            logging.info("Loading SentenceTransformer model...")
-            _model = SentenceTransformer('all-MiniLM-L6-v2')
+            if EMBEDDING_BACKEND == "torch":
+                # Imported here so the ONNX backends never pay for the torch import
+                from sentence_transformers import SentenceTransformer
+                logging.info("Loading SentenceTransformer model...")
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+            else:
+                try:
+                    from onnx_embedder import OnnxEncoder
+                except ImportError:
+                    from src.onnx_embedder import OnnxEncoder
+                logging.info(f"Loading {EMBEDDING_BACKEND} embedding model from {EMBEDDING_ONNX_DIR}...")
+                _model = OnnxEncoder(EMBEDDING_ONNX_DIR, EMBEDDING_BACKEND)
             logging.info("Model loaded.")
         except Exception as e:
             logging.error(f"Failed to load embedding model: {e}")
             raise e
     return _model
 
+def get_embedding_cache():
+    global _cache
+    if _cache is None and EMBEDDING_CACHE_ENABLED:
+        try:
+            _cache = EmbeddingCache(EMBEDDING_CACHE_PATH, embedding_model_id(), max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        except Exception as e:
+            logging.warning(f"Embedding cache unavailable, continuing without it: {e}")
+    return _cache
+
 def get_embedding(text):
     model = get_embedding_model()
     return model.encode(text).tolist()
+
+def get_embeddings(texts, batch_size=EMBEDDING_BATCH_SIZE, normalize=False, use_cache=True):
+    """
+    Encodes many texts in batches. Returns a float32 array of shape (len(texts), dim).
+    With normalize=True every row has unit length.
+    Texts already in the on-disk embedding cache are not re-encoded.
+    """
+    texts = list(texts)
+    if not texts:
+        # Don't load the model just to learn its output size
+        dim = _model.get_sentence_embedding_dimension() if _model is not None else EMBEDDING_DIM
+        return np.zeros((0, dim), dtype=np.float32)
+    cache = get_embedding_cache() if use_cache else None
+    cached = cache.get_many(texts) if cache is not None else {}
+
+    missing = [i for i in range(len(texts)) if i not in cached]
+    instrumentation.increment("embedding_texts_total", len(texts))
+    instrumentation.increment("embedding_cache_hits_total", len(cached))
+    encoded = None
+    if missing:
+        model = get_embedding_model()
+        with instrumentation.timer("embedding_batch_seconds"):
+            encoded = np.asarray(model.encode(
+                [texts[i] for i in missing],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ), dtype=np.float32)
+        if cache is not None:
+            cache.put_many([texts[i] for i in missing], encoded)
+
+    dim = encoded.shape[1] if encoded is not None else next(iter(cached.values())).shape[0]
+    vectors = np.empty((len(texts), dim), dtype=np.float32)
+    for i, vector in cached.items():
+        vectors[i] = vector
+    if encoded is not None:
+        vectors[missing] = encoded
+
+    if normalize:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+    return vectors
@@ -0,0 +1,213 @@
+
+import logging
+import threading
+import numpy as np
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+
+def normalize_rows(vectors):
+    """
+    Returns a float32 copy of `vectors` with every row scaled to unit length.
+    Zero rows are left as zeros so they never score above anything.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    Resident cosine-similarity index over article embeddings, keyed by article link.
+
+    Rows are stored pre-normalized in one float32 matrix, so a query costs a single
+    matrix-vector product plus a top-k partition instead of a collection scan.
+
+    mode="exact" scores every row. mode="ivf" clusters the rows with k-means and only
+    scores the `nprobe` clusters closest to the query (approximate, much less work
+    on large corpora). Below `nlist * 4` rows the IVF mode falls back to exact search.
+    """
+
+    def __init__(self, mode="exact", nlist=64, nprobe=8):
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown vector index mode: {mode}")
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+
+        self._lock = threading.RLock()
+        self._matrix = None          # capacity-sized buffer, first `_size` rows are live
+        self._size = 0
+        self._keys = []              # row -> key
+        self._rows = {}              # key -> row
+
+        # IVF state
+        self._centroids = None
+        self._assignments = None     # row -> cluster id
+        self._trained_size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def dim(self):
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the vector buffer and IVF state (allocated capacity, not just live rows).
+        """
+        total = 0
+        for array in (self._matrix, self._assignments, self._centroids):
+            if array is not None:
+                total += array.nbytes
+        return total
+
+    def _ensure_capacity(self, extra, dim):
+        if self._matrix is None:
+            capacity = max(64, extra)
+            self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+            self._assignments = np.full(capacity, -1, dtype=np.int32)
+            return
+        if dim != self._matrix.shape[1]:
+            raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._matrix.shape[1]}")
+        needed = self._size + extra
+        if needed > self._matrix.shape[0]:
+            capacity = max(needed, self._matrix.shape[0] * 2)
+            matrix = np.zeros((capacity, dim), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+            assignments = np.full(capacity, -1, dtype=np.int32)
+            assignments[:self._size] = self._assignments[:self._size]
+            self._matrix = matrix
+            self._assignments = assignments
+
+    def upsert(self, keys, vectors):
+        """
+        Inserts or replaces the vectors for `keys`. Vectors may be lists or arrays.
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        matrix = normalize_rows(vectors)
+        if matrix.shape[0] != len(keys):
+            raise ValueError("keys and vectors must have the same length")
+
+        with self._lock:
+            self._ensure_capacity(len(keys), matrix.shape[1])
+            touched = []
+            for key, vector in zip(keys, matrix):
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._size
+                    self._rows[key] = row
+                    self._keys.append(key)
+                    self._size += 1
+                self._matrix[row] = vector
+                touched.append(row)
+
+            if self.mode == "ivf":
+                self._update_ivf(np.asarray(touched, dtype=np.int64))
+
+    def remove(self, keys):
+        """
+        Drops `keys` from the index by moving the last row into the freed slot.
+        """
+        with self._lock:
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    last_key = self._keys[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._assignments[row] = self._assignments[last]
+                    self._keys[row] = last_key
+                    self._rows[last_key] = row
+                self._keys.pop()
+                self._assignments[last] = -1
+                self._size -= 1
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+            self._size = 0
+            self._keys = []
+            self._rows = {}
+            self._centroids = None
+            self._assignments = None
+            self._trained_size = 0
+
+    # --- IVF ---
+
+    def _update_ivf(self, rows):
+        # (Re)train once the index has grown enough that the clustering is stale
+        if self._size < self.nlist * 4:
+            return
+        if self._centroids is None or self._size >= self._trained_size * 2:
+            self._train()
+        elif len(rows):
+            self._assignments[rows] = self._assign(self._matrix[rows])
+
+    def _assign(self, vectors):
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _train(self, iterations=10, seed=0):
+        data = self._matrix[:self._size]
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(self._size, self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            for cluster in range(self.nlist):
+                members = data[labels == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = normalize_rows(centroids)
+        self._centroids = centroids
+        self._assignments[:self._size] = self._assign(data)
+        self._trained_size = self._size
+        logging.info(f"Trained IVF vector index: {self.nlist} clusters over {self._size} vectors.")
+
+    # --- Search ---
+
+    def search(self, query, top_k=5, keys=None):
+        """
+        Returns up to `top_k` (key, score) pairs ordered by descending cosine similarity.
+        If `keys` is given, only those keys are considered (e.g. a date-filtered subset).
+        """
+        with self._lock:
+            if self._size == 0 or top_k <= 0:
+                return []
+            q = normalize_rows(query)[0]
+            if q.shape[0] != self._matrix.shape[1]:
+                raise ValueError(f"Query dimension {q.shape[0]} does not match index dimension {self._matrix.shape[1]}")
+
+            if keys is not None:
+                rows = np.fromiter((self._rows[k] for k in keys if k in self._rows), dtype=np.int64)
+            elif self.mode == "ivf" and self._centroids is not None:
+                probes = np.argsort(self._centroids @ q)[::-1][:self.nprobe]
+                rows = np.flatnonzero(np.isin(self._assignments[:self._size], probes))
+            else:
+                rows = None
+
+            if rows is None:
+                scores = self._matrix[:self._size] @ q
+            else:
+                if rows.size == 0:
+                    return []
+                scores = self._matrix[rows] @ q
+
+            k = min(top_k, scores.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            if rows is not None:
+                return [(self._keys[rows[i]], float(scores[i])) for i in top]
+            return [(self._keys[i], float(scores[i])) for i in top]